@@ -1,9 +1,13 @@
 import random
+import time
+
+import instrumentation
 
 # Constants
 BOARD_SIZE = 10  # The size of the game board
 SHIP_NAMES = ["Carrier", "Battleship", "Cruiser", "Submarine", "Destroyer"]  # Names of the ships
 SHIP_LENGTHS = [5, 4, 3, 3, 2]  # Length of each ship
+EXACT_SEARCH_LIMIT = 200000  # Exact search is tried when the product of placement counts is below this
 
 def create_board():
     """
@@ -102,6 +106,29 @@ def place_ships(player_board):
 
 
 
+def place_ships_randomly(player_board, rng=random):
+    """
+    Places the whole fleet at random without asking, for computer players.
+
+    Args:
+    player_board (list): The player's game board.
+    rng: Where the random placements come from, anything with randrange and choice
+    """
+    for ship, length in zip(SHIP_NAMES, SHIP_LENGTHS):
+        placed = False
+        while not placed:
+            direction = rng.choice('rd')
+            if direction == 'r':
+                start_x, start_y = rng.randrange(BOARD_SIZE - length + 1), rng.randrange(BOARD_SIZE)
+                positions = [(start_x + j, start_y) for j in range(length)]
+            else:
+                start_x, start_y = rng.randrange(BOARD_SIZE), rng.randrange(BOARD_SIZE - length + 1)
+                positions = [(start_x, start_y + j) for j in range(length)]
+            if all(player_board[y][x] == " " for x, y in positions):
+                for x, y in positions:
+                    player_board[y][x] = ship[0]
+                placed = True
+
 
 def register_shot(grid):
     """
@@ -131,6 +158,7 @@ def register_shot(grid):
             print("Invalid coordinates or already shot, try again.")
     return x, y
 
+@instrumentation.instrumented('battleship.check_shot')
 def check_shot(target_board, x, y):
     """
     Checks if a shot hits a ship.
@@ -153,6 +181,7 @@ def check_shot(target_board, x, y):
         target_board[x][y] = "-"
         return False, None
 
+@instrumentation.instrumented('battleship.check_win_condition')
 def check_win_condition(board):
     """
     Checks if all ships are sunk
@@ -165,10 +194,239 @@ def check_win_condition(board):
     """
     for row in board:
         for cell in row:
-            if cell != " ":
+            if cell != " " and cell != "X" and cell != "-":
                 return False
     return True
 
+class _SearchTimeout(Exception):
+    pass
+
+
+_ship_masks_cache = {}
+
+
+def _ship_masks(length):
+    """
+    Every square mask a ship of this length covers on an empty board, square x, y being bit
+    x * BOARD_SIZE + y. They never change, so they are worked out once per length.
+    """
+    if length not in _ship_masks_cache:
+        masks = []
+        for x in range(BOARD_SIZE):
+            for y in range(BOARD_SIZE):
+                for dx, dy in ((1, 0), (0, 1)):
+                    if x + dx * (length - 1) >= BOARD_SIZE or y + dy * (length - 1) >= BOARD_SIZE:
+                        continue
+                    mask = 0
+                    for j in range(length):
+                        mask |= 1 << ((x + dx * j) * BOARD_SIZE + y + dy * j)
+                    masks.append(mask)
+        _ship_masks_cache[length] = masks
+    return _ship_masks_cache[length]
+
+
+class BattleshipAI:
+    """
+    A computer opponent. It hunts on a checkerboard until it hits something, then targets the
+    squares next to its hits. Once the possible placements of the fleet are few enough it
+    switches to exact search: it counts every placement of the SHIP_LENGTHS fleet that agrees
+    with the shots so far and fires where a ship is most likely to be.
+    """
+
+    def __init__(self, time_budget=0.003):
+        """
+        Args:
+        time_budget (float): Seconds the exact search may take per move before falling back
+        """
+        self.time_budget = time_budget
+        self.shots = create_board()
+        self.hit_ships = {}  # (x, y) -> the ship letter check_shot reported there
+        self.nodes_searched = 0
+        self.last_mode = None
+
+    def record_shot(self, x, y, hit, ship_hit):
+        """
+        Remembers the result of a shot, pass it exactly what check_shot returned.
+        """
+        self.shots[x][y] = "X" if hit else "-"
+        if hit:
+            self.hit_ships[(x, y)] = ship_hit
+
+    def choose_shot(self, rng=random):
+        """
+        Picks the next square to fire at.
+
+        Args:
+        rng: Where the random tie breaks come from
+
+        Returns:
+        tuple: The coordinates (x, y) of the shot
+        """
+        # the budget covers the whole move, building the placements included
+        deadline = time.perf_counter() + self.time_budget
+        self.nodes_searched = 0
+        shot = self._exact_shot(rng, deadline)
+        if shot is not None:
+            self.last_mode = "exact"
+            return shot
+        shot = self._target_shot(rng)
+        if shot is not None:
+            self.last_mode = "target"
+            return shot
+        self.last_mode = "hunt"
+        return self._hunt_shot(rng)
+
+    def _unshot(self):
+        return [(x, y) for x in range(BOARD_SIZE) for y in range(BOARD_SIZE) if self.shots[x][y] == " "]
+
+    def _sunk_letters(self):
+        """
+        Letters whose every ship has been hit on all of its squares.
+        """
+        sunk = set()
+        for letter in set(self.hit_ships.values()):
+            fleet_length = sum(length for name, length in zip(SHIP_NAMES, SHIP_LENGTHS) if name[0] == letter)
+            if list(self.hit_ships.values()).count(letter) >= fleet_length:
+                sunk.add(letter)
+        return sunk
+
+    def _hunt_shot(self, rng):
+        sunk = self._sunk_letters()
+        smallest = min((length for name, length in zip(SHIP_NAMES, SHIP_LENGTHS) if name[0] not in sunk), default=1)
+        unshot = self._unshot()
+        # every ship still afloat covers at least one square of this lattice
+        lattice = [(x, y) for x, y in unshot if (x + y) % smallest == 0]
+        return rng.choice(lattice or unshot)
+
+    def _target_shot(self, rng):
+        sunk = self._sunk_letters()
+        open_hits = [square for square, letter in self.hit_ships.items() if letter not in sunk]
+        in_line = []
+        next_to = []
+        for x, y in open_hits:
+            letter = self.hit_ships[(x, y)]
+            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE) or self.shots[nx][ny] != " ":
+                    continue
+                next_to.append((nx, ny))
+                # a hit of the same ship on the other side means the ship runs along this line
+                if self.hit_ships.get((x - dx, y - dy)) == letter:
+                    in_line.append((nx, ny))
+        if in_line or next_to:
+            return rng.choice(in_line or next_to)
+        return None
+
+    def _placements(self, deadline):
+        """
+        Every square mask each ship could occupy given the shots so far.
+
+        Args:
+        deadline (float): time.perf_counter() value after which the search gives up
+        """
+        misses_mask = 0
+        hits_by_letter = {}
+        for x in range(BOARD_SIZE):
+            for y in range(BOARD_SIZE):
+                if self.shots[x][y] == "-":
+                    misses_mask |= 1 << (x * BOARD_SIZE + y)
+        for (x, y), letter in self.hit_ships.items():
+            hits_by_letter[letter] = hits_by_letter.get(letter, 0) | 1 << (x * BOARD_SIZE + y)
+        hits_mask = 0
+        for letter_hits in hits_by_letter.values():
+            hits_mask |= letter_hits
+        ships_by_letter = {}
+        for name in SHIP_NAMES:
+            ships_by_letter[name[0]] = ships_by_letter.get(name[0], 0) + 1
+
+        placements = []
+        for name, length in zip(SHIP_NAMES, SHIP_LENGTHS):
+            if time.perf_counter() > deadline:
+                raise _SearchTimeout
+            letter = name[0]
+            own_hits = hits_by_letter.get(letter, 0)
+            # a ship can't sit on a miss or on a square another ship was hit on
+            blocked = misses_mask | (hits_mask & ~own_hits)
+            ship_placements = [mask for mask in _ship_masks(length) if not mask & blocked]
+            # a ship with a letter of its own has to cover every hit of that letter
+            if ships_by_letter[letter] == 1 and own_hits:
+                ship_placements = [mask for mask in ship_placements if not own_hits & ~mask]
+            placements.append(ship_placements)
+        return placements
+
+    def _exact_shot(self, rng, deadline):
+        try:
+            placements = self._placements(deadline)
+        except _SearchTimeout:
+            return None
+        size = 1
+        for ship_placements in placements:
+            size *= len(ship_placements)
+        if not size or size > EXACT_SEARCH_LIMIT:
+            return None
+        placements.sort(key=len)
+
+        hits_mask = 0
+        for x, y in self.hit_ships:
+            hits_mask |= 1 << (x * BOARD_SIZE + y)
+        unshot_mask = 0
+        for x, y in self._unshot():
+            unshot_mask |= 1 << (x * BOARD_SIZE + y)
+        # hits each remaining ship could still cover, to give up early on hopeless branches
+        reachable = [0] * (len(placements) + 1)
+        for i in range(len(placements) - 1, -1, -1):
+            union = 0
+            for mask in placements[i]:
+                union |= mask
+            reachable[i] = reachable[i + 1] | union
+
+        memo = {}
+
+        def count(i, occupied):
+            """
+            Returns (placements of ships i.. that fit with occupied, {square: placements covering it})
+            """
+            if hits_mask & ~(occupied | reachable[i]):
+                return 0, {}
+            if i == len(placements):
+                return 1, {}
+            key = (i, occupied)
+            if key in memo:
+                return memo[key]
+            self.nodes_searched += 1
+            total = 0
+            squares = {}
+            for mask in placements[i]:
+                if mask & occupied:
+                    continue
+                if time.perf_counter() > deadline:
+                    raise _SearchTimeout
+                ways, covered = count(i + 1, occupied | mask)
+                if not ways:
+                    continue
+                total += ways
+                for square, square_ways in covered.items():
+                    squares[square] = squares.get(square, 0) + square_ways
+                open_squares = mask & unshot_mask
+                while open_squares:
+                    low_bit = open_squares & -open_squares
+                    square = low_bit.bit_length() - 1
+                    squares[square] = squares.get(square, 0) + ways
+                    open_squares ^= low_bit
+            memo[key] = (total, squares)
+            return memo[key]
+
+        try:
+            total, squares = count(0, 0)
+        except _SearchTimeout:
+            return None
+        if not total or not squares:
+            return None
+        best = max(squares.values())
+        square = rng.choice([square for square, ways in squares.items() if ways == best])
+        return divmod(square, BOARD_SIZE)
+
+
 def run_game():
     """
     Runs the game
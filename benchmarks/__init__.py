@@ -0,0 +1,9 @@
+"""
+Benchmarks for carmen, battleship and jumps_and_hits.
+
+Each benchmark times existing game functions on synthetic workloads of growing size and
+reports how the time scales. Run it from the repository root with
+
+    python -m benchmarks --save baseline.json
+    python -m benchmarks --compare baseline.json
+"""
@@ -0,0 +1,218 @@
+"""
+Runs the benchmarks, optionally saving the results as a JSON baseline or comparing to one.
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import math
+import sys
+import time
+
+import battleship
+import carmen
+import jumps_and_hits
+from benchmarks import workloads
+
+
+def bench_carmen_can_go(size):
+    game = workloads.make_carmen_world(size)
+    locations = game['locations']
+    carmen.build_world(locations, game['people'], game['clues'])
+    for location in locations.values():
+        location['starts-locked'] = False
+    names = list(locations)
+
+    def run():
+        carmen.can_go(names[0], names[-1], locations)
+        carmen.can_go(names[0], 'Nowhere', locations)
+    return run
+
+
+def bench_carmen_talk_chain(size):
+    game = workloads.make_carmen_world(size)
+    carmen.build_world(game['locations'], game['people'], game['clues'])
+
+    # talking unlocks people, so every repeat gets a fresh copy made outside the timing
+    def setup():
+        return copy.deepcopy(game)
+
+    def run(game):
+        locations, people, clues = game['locations'], game['people'], game['clues']
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i, location in enumerate(locations):
+                carmen.talk_to_person(f'Person{i}', location, locations, people, clues)
+    return setup, run
+
+
+def bench_battleship_shots(size):
+    shots = workloads.make_shot_sequence(size)
+
+    def run():
+        board = workloads.make_battleship_board(size)
+        for x, y in shots:
+            battleship.check_shot(board, x, y)
+            battleship.check_win_condition(board)
+    return run
+
+
+def bench_battleship_win_check(size):
+    board = [[" " for _ in range(size)] for _ in range(size)]
+
+    def run():
+        battleship.check_win_condition(board)
+    return run
+
+
+def bench_jumps_generate(size):
+    def run():
+        jumps_and_hits.generate_random_map(size, 1)
+    return run
+
+
+def bench_jumps_play(size):
+    game_map = workloads.make_jumps_map(size)
+
+    def run():
+        for seed in range(20):
+            jumps_and_hits.summarize_game(game_map, seed, max_steps=10 * size)
+    return run
+
+
+def bench_jumps_render(size):
+    game_map = workloads.make_jumps_map(size)
+
+    def run():
+        for _ in jumps_and_hits.render_board(game_map):
+            pass
+    return run
+
+
+def bench_jumps_analyze(size):
+    game_map = workloads.make_jumps_map(size)
+
+    def run():
+        jumps_and_hits.analyze_map(game_map)
+    return run
+
+
+# name: (benchmark, sizes). benchmark(size) returns run(), or (setup, run) when every repeat needs
+# fresh state: then only run(setup()) is timed.
+BENCHMARKS = {
+    'carmen.can_go': (bench_carmen_can_go, [100, 200, 400, 800, 1600]),
+    'carmen.talk_chain': (bench_carmen_talk_chain, [100, 200, 400, 800, 1600]),
+    'battleship.shots': (bench_battleship_shots, [10, 20, 40, 80]),
+    'battleship.win_check': (bench_battleship_win_check, [10, 20, 40, 80, 160]),
+    'jumps_and_hits.generate': (bench_jumps_generate, [1000, 2000, 4000, 8000, 16000]),
+    'jumps_and_hits.play': (bench_jumps_play, [100, 1000, 10000, 100000]),
+    'jumps_and_hits.render': (bench_jumps_render, [1000, 2000, 4000, 8000, 16000]),
+    'jumps_and_hits.analyze': (bench_jumps_analyze, [1000, 2000, 4000, 8000, 16000]),
+}
+
+
+def time_call(run, repeats):
+    """
+    :param run: what a benchmark returned, run() or a (setup, run) pair timed as run(setup())
+    :return: the fastest of repeats runs in seconds, the least noisy estimate of the cost
+    """
+    setup = None
+    if isinstance(run, tuple):
+        setup, run = run
+    best = float('inf')
+    for _ in range(repeats):
+        arguments = (setup(),) if setup else ()
+        start_time = time.perf_counter()
+        run(*arguments)
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def scaling_exponent(sizes, seconds):
+    """
+    :return: the slope of log(time) against log(size) between the smallest and largest size,
+        about 1 for linear work, 2 for quadratic and so on
+    """
+    if len(sizes) < 2 or min(seconds[0], seconds[-1]) <= 0:
+        return None
+    return math.log(seconds[-1] / seconds[0]) / math.log(sizes[-1] / sizes[0])
+
+
+def run_benchmarks(names=None, repeats=3):
+    """
+    :param names: which BENCHMARKS to run, all of them if not given
+    :param repeats: how many times each size is timed
+    :return: a dict mapping each name to its 'sizes', 'seconds' and 'exponent'
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        benchmark, sizes = BENCHMARKS[name]
+        seconds = [time_call(benchmark(size), repeats) for size in sizes]
+        results[name] = {'sizes': sizes, 'seconds': seconds, 'exponent': scaling_exponent(sizes, seconds)}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints how each size compares to the baseline.
+
+    :param tolerance: the largest slowdown ratio that is not counted as a regression
+    :return: the number of regressions found
+    """
+    regressions = 0
+    for name, result in results.items():
+        if name not in baseline:
+            print(f'{name}: not in the baseline')
+            continue
+        baseline_seconds = dict(zip(baseline[name]['sizes'], baseline[name]['seconds']))
+        for size, seconds in zip(result['sizes'], result['seconds']):
+            if size not in baseline_seconds or not baseline_seconds[size]:
+                continue
+            ratio = seconds / baseline_seconds[size]
+            flag = ''
+            if ratio > tolerance:
+                regressions += 1
+                flag = '  REGRESSION'
+            print(f'{name:28} n={size:<8} {seconds * 1000:10.3f} ms  {ratio:6.2f}x baseline{flag}')
+    return regressions
+
+
+def report(results):
+    for name, result in results.items():
+        exponent = result['exponent']
+        print(f"{name:28} scaling ~n^{exponent:.2f}" if exponent is not None else name)
+        for size, seconds in zip(result['sizes'], result['seconds']):
+            print(f'{"":28} n={size:<8} {seconds * 1000:10.3f} ms')
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Benchmarks for carmen, battleship and jumps_and_hits')
+    parser.add_argument('names', nargs='*', help=f'benchmarks to run, from {", ".join(BENCHMARKS)}')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--save', help='write the results to this JSON baseline file')
+    parser.add_argument('--compare', help='compare the results to this JSON baseline file')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='slowdown ratio above which a size counts as a regression')
+    options = parser.parse_args(arguments)
+
+    unknown = [name for name in options.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(unknown)}')
+
+    results = run_benchmarks(options.names, options.repeats)
+    report(results)
+
+    if options.save:
+        with open(options.save, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+    if options.compare:
+        with open(options.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(results, baseline, options.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Synthetic workloads of any size for the benchmarks.
+"""
+
+import random
+
+from battleship import SHIP_LENGTHS
+from jumps_and_hits import generate_random_map
+
+
+def make_carmen_world(size, seed=1):
+    """
+    Builds a .game world with size locations. Location i is connected to i + 1 and to a few
+    random others, everything after the start begins locked, and the person at location i
+    unlocks location i + 1 and the person there, so the unlocks form one long chain.
+
+    :param size: the number of locations
+    :param seed: the seed of the random connections
+    :return: the game as a dict, in the same layout as a loaded .game file
+    """
+    rng = random.Random(seed)
+    names = [f'Location{i}' for i in range(size)]
+    people_names = [f'Person{i}' for i in range(size)]
+    locations = {}
+    people = {}
+    for i, name in enumerate(names):
+        connections = [names[i + 1]] if i + 1 < size else []
+        connections += [names[rng.randrange(size)] for _ in range(2)]
+        locations[name] = {'connections': connections, 'starts-locked': i > 0, 'carmen': i == size - 1}
+        people[people_names[i]] = {
+            'location': name,
+            'conversation': f'Go on to {names[(i + 1) % size]}.',
+            'starts-hidden': i > 0,
+            'unlock-locations': [names[i + 1]] if i + 1 < size else [],
+            'unlock-people': [people_names[i + 1]] if i + 1 < size else [],
+            'unlock-clues': [],
+        }
+    return {'locations': locations, 'people': people, 'clues': {}, 'starting-location': names[0]}
+
+
+def make_battleship_board(size, seed=1):
+    """
+    Places one SHIP_LENGTHS fleet for every 100 squares at random on a size x size board.
+
+    :param size: the width and height of the board
+    :param seed: the seed of the placements
+    :return: the board, a 2d list in the same layout as battleship.create_board
+    """
+    rng = random.Random(seed)
+    board = [[" " for _ in range(size)] for _ in range(size)]
+    fleets = max(size * size // 100, 1)
+    for ship_length in SHIP_LENGTHS * fleets:
+        if ship_length > size:
+            continue
+        # give up on a ship after 100 overlapping tries, crowded boards just get fewer ships
+        for _ in range(100):
+            along, across = rng.randrange(size - ship_length + 1), rng.randrange(size)
+            if rng.random() < 0.5:
+                positions = [(along + j, across) for j in range(ship_length)]
+            else:
+                positions = [(across, along + j) for j in range(ship_length)]
+            if all(board[px][py] == " " for px, py in positions):
+                for px, py in positions:
+                    board[px][py] = 'S'
+                break
+    return board
+
+
+def make_shot_sequence(size, seed=1):
+    """
+    :return: every square of a size x size board once, in a random order
+    """
+    shots = [(x, y) for x in range(size) for y in range(size)]
+    random.Random(seed).shuffle(shots)
+    return shots
+
+
+def make_jumps_map(size, seed=1):
+    """
+    :return: a generate_random_map board of length size
+    """
+    return generate_random_map(size, seed)
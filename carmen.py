@@ -1,8 +1,26 @@
+"""
+File:    carmen.py
+Author:  Hader Hamayun
+Date:    5/14/24
+Section: 14
+E-mail:  haderh1@umbc.edu
+Description:
+  You play the game where's carmen
+"""
+
+import hashlib
 import json
 
+import instrumentation
+
+# sha256 of a .game file -> its validated and normalised JSON, so unchanged files skip validation
+_validated_games = {}
+
+
 def load_game(game_file_name):
     """
-    Loads the game data from a JSON file.
+    Loads the game data from a JSON file, checking it with validate_game the first time
+    the file's contents are seen.
 
     Arguments:
     - game_file_name (str): The name of the JSON file containing game data.
@@ -10,281 +28,130 @@ def load_game(game_file_name):
     Returns:
     - dict or None: The game data if loaded successfully
     """
-    game = None
     try:
-        with open(game_file_name) as game_file:
+        with open(game_file_name, 'rb') as game_file:
             game_data = game_file.read()
-            game = json.loads(game_data)
     except FileNotFoundError:
         print('That file does not exist.')
-    return game
-
+        return None
 
-def build_world(locations, people, clues):
-    """
-    Initializes the game world by setting up locations, people, and clues.
+    file_hash = hashlib.sha256(game_data).hexdigest()
+    if file_hash in _validated_games:
+        return json.loads(_validated_games[file_hash])
 
-    Arguments:
-    - locations (dict): Dictionary containing location
-    - people (dict): Dictionary containing people
-    - clues (dict): Dictionary containing clue
-    """
-    for loc_name, loc_data in locations.items():
-        loc_data['locked'] = loc_data.get('starts-locked', False)
-    for person_name, person_data in people.items():
-        person_data['hidden'] = person_data.get('starts-hidden', False)
-    for clue_name, clue_data in clues.items():
-        clue_data['hidden'] = True
+    try:
+        game = json.loads(game_data)
+    except json.JSONDecodeError as error:
+        print('That file is not valid JSON: {}'.format(error))
+        return None
+
+    game, errors = validate_game(game)
+    if errors:
+        print('{} has {} error{}:'.format(game_file_name, len(errors), '' if len(errors) == 1 else 's'))
+        for error in errors:
+            print('  ' + error)
+        return None
+    _validated_games[file_hash] = json.dumps(game)
+    return game
 
 
-def can_go(start, end, locations, visited=None):
+def find_name(name, table):
     """
-    Checks if you can move from one place to another
+    Looks a name up ignoring capitalisation.
 
     Arguments:
-    - start (str): The starting location.
-    - end (str): The destination location.
-    - locations (dict): Dictionary containing location data.
-    - visited (list): List of visited locations
+    - name (str): The name as typed or written.
+    - table (dict): Dictionary of locations, people or clues.
 
     Returns:
-    - bool: True if movement is possible or else it is false
-    """
-    if visited is None:
-        visited = []
-    visited.append(start)
-    if start == end:
-        return True
-    if end in locations[start]['connections'] and not locations[end]['starts-locked']:
-        return True
-    for neighbor in locations[start]['connections']:
-        if neighbor not in visited and not locations[neighbor]['starts-locked']:
-            if can_go(neighbor, end, locations, visited):
-                return True
-    return False
-
-
-def talk_to_person(person_name, current_location, locations, people, clues):
-    """
-    Handles interactions with characters in the game.
-
-    Arguments:
-    - person_name (str): The name of the person to talk to.
-    - current_location (str): The current location of the player.
-    - locations (dict): Dictionary containing location data.
-    - people (dict): Dictionary containing people data.
-    - clues (dict): Dictionary containing clue data.
-    """
-    person_data = people.get(person_name.capitalize())
-
-    # Check if the person exists, is in the current location, and is not hidden
-    if person_data and person_data['location'] == current_location and not person_data['hidden']:
-        print(person_data['conversation'])
-
-        # Unlock locations
-        unlock_locations = person_data.get('unlock-locations', [])
-        for loc_name in unlock_locations:
-            if loc_name in locations:
-                locations[loc_name]['starts-locked'] = False
-
-        # Unhide people
-        unlock_people = person_data.get('unlock-people', [])
-        for unlock_person_name in unlock_people:
-            if unlock_person_name.capitalize() in people:
-                people[unlock_person_name.capitalize()]['hidden'] = False
-
-        # Unhide clues
-        unlock_clues = person_data.get('unlock-clues', [])
-        for unlock_clue_name in unlock_clues:
-            if unlock_clue_name.capitalize() in clues:
-                clues[unlock_clue_name.capitalize()]['hidden'] = False
-    else:
-        print("There's no one named {} here to talk to.".format(person_name))
-
-
-def investigate_location(clue_name, current_location, locations, people, clues):
-    """
-    Allows the player to investigate a location for clues.
-
-    Arguments:
-    - clue_name (str): The name of the clue to investigate.
-    - current_location (str): The current location of the player.
-    - locations (dict): Dictionary containing location data.
-    - people (dict): Dictionary containing people data.
-    - clues (dict): Dictionary containing clue data.
-    """
-    # Remove "investigate" from the clue_name and capitalize the rest of the words
-    clue_name = " ".join([word.capitalize() for word in clue_name.split()])
-
-    # Check if the clue exists, is not hidden, and is unlocked at the current location
-    if clue_name in clues and not clues[clue_name]['hidden'] and current_location in clues[clue_name].get(
-            'unlock-locations', []):
-        print(clues[clue_name]['clue-text'])
-
-        # Unlock locations
-        unlock_locations = clues[clue_name].get('unlock-locations', [])
-        for loc_name in unlock_locations:
-            if loc_name in locations:
-                locations[loc_name]['starts-locked'] = False
-
-        # Unhide people
-        unlock_people = clues[clue_name].get('unlock-people', [])
-        for person_name in unlock_people:
-            if person_name.capitalize() in people:
-                people[person_name.capitalize()]['hidden'] = False
-
-        # Unhide other clues
-        unlock_clues = clues[clue_name].get('unlock-clues', [])
-        for other_clue_name in unlock_clues:
-            if other_clue_name.capitalize() in clues:
-                clues[other_clue_name.capitalize()]['hidden'] = False
-    else:
-        print("There's no clue named '{}' here.".format(clue_name))
-
-
-def display_locations(locations):
-    """
-    Displays the available locations.
-
-    Arguments:
-    - locations (dict): Dictionary containing location data.
-    """
-    print("Locations:")
-    for loc_name in locations:
-        loc_data = locations[loc_name]
-        print(f"{loc_name} {'(locked)' if loc_data['starts-locked'] else ''}")
-
-
-def display_clues(current_location, clues):
-    """
-    Displays the clues available at the current location.
-
-    Arguments:
-    - current_location (str): The current location of the player.
-    - clues (dict): Dictionary containing clue data.
+    - str or None: The name as it is spelled in table, or None if there is no such name
     """
-    print("Clues at {}: ".format(current_location))
-    for clue_name in clues:
-        clue_data = clues[clue_name]
-        if not clue_data['hidden'] and current_location in clue_data.get('unlock-locations', []):
-            print(clue_name, ":", clue_data['clue-text'])
+    if name in table:
+        return name
+    folded_name = name.casefold()
+    for table_name in table:
+        if table_name.casefold() == folded_name:
+            return table_name
+    return None
 
 
-def display_people(current_location, people):
+def validate_game(game):
     """
-    Displays the people available at the current location.
+    Checks every cross reference of a game in one pass and rewrites each reference to the
+    exact spelling of the name it refers to, so the game never has to fix up capitalisation
+    while it runs.
 
     Arguments:
-    - current_location (str): The current location of the player.
-    - people (dict): Dictionary containing people data.
-    """
-    print("People at {}: ".format(current_location))
-    for person_name in people:
-        person_data = people[person_name]
-        if not person_data['hidden'] and person_data['location'] == current_location:
-            print(person_name)
-
-
-def carmen_sandiego(file_name):
-    """
-    Runs the main game loop for Where's Carmen game.
-
-    Arguments:
-    - file_name (str): The name of the game data file.
-    """
-    game = load_game(file_name)
-    if not game:
-        return
-
-    locations = game.get('locations', {})
-    people = game.get('people', {})
-    clues = game.get('clues', {})
-    starting_location = game.get('starting-location', '')
-
-    current_location = starting_location
-
-    build_world(locations, people, clues)
-
-    # Counter for unsuccessful searches for Carmen
-    unsuccessful_searches = 0
-
-    # Game loop
-    while True:
-        print("\nYou are at:", current_location)
-        command = input("What would you like to do? ").lower()
+    - game (dict): The game data as loaded from a .game file.
 
-        if command == "display locations":
-            display_locations(locations)
-        elif command == "display clues":
-            display_clues(current_location, clues)
-        elif command == "display people":
-            display_people(current_location, people)
-        elif command.startswith("go to ") or command.startswith("travel to "):
-            destination = command[6:].capitalize()
-            if can_go(current_location, destination, locations):
-                current_location = destination
-                print("You have traveled to {}.".format(destination))
-            else:
-                print("You can't go there from here.")
-        elif command.startswith("talk to "):
-            person_name = command[8:].strip()
-            talk_to_person(person_name, current_location, locations, people, clues)
-        elif command.startswith("investigate "):
-            clue_name = command[12:].strip()
-            investigate_location(clue_name, current_location, locations, people, clues)
-        elif command == "catch carmen":
-            if locations[current_location].get('carmen', False):
-                print("You have caught Carmen Sandiego! You win the game!")
-            else:
-                unsuccessful_searches += 1
-                print("You didn't find Carmen here.")
-                if unsuccessful_searches == 3:
-                    print("You have searched unsuccessfully for Carmen three times. You lose the game.")
-        elif command == "quit" or command == "exit":
-            print("Exiting the game...")
+    Returns:
+    - tuple: (game, errors) where game is the normalised game data and errors is a list of
+      every problem found, empty if the game is valid
+    """
+    errors = []
+    if not isinstance(game, dict):
+        return game, ['The game must be a JSON object.']
+
+    sections = {}
+    for section in ('locations', 'people', 'clues'):
+        table = game.get(section, {})
+        if not isinstance(table, dict):
+            errors.append('"{}" must be an object.'.format(section))
+            table = {}
+        folded_names = {}
+        for name in table:
+            if name.casefold() in folded_names:
+                errors.append('{} "{}" and "{}" only differ in capitalisation.'.format(
+                    section.capitalize(), folded_names[name.casefold()], name))
+            folded_names[name.casefold()] = name
+        sections[section] = table
+    locations, people, clues = sections['locations'], sections['people'], sections['clues']
+
+    def resolve(name, table, section, where):
+        resolved = find_name(name, table) if isinstance(name, str) else None
+        if resolved is None:
+            errors.append('{} refers to unknown {} "{}".'.format(where, section, name))
+            return name
+        return resolved
+
+    def resolve_list(data, key, table, section, where):
+        names = data.get(key, [])
+        if not isinstance(names, list):
+            errors.append('{} "{}" must be a list.'.format(where, key))
             return
-        else:
-            print("Command not recognized.")
-
-if __name__ == '__main__':
-    game_file_name = input('Which game do you want to play? ')
-    carmen_sandiego(game_file_name)
-
-
-
-
-
-
-"""
-File:    carmen.py
-Author:  Hader Hamayun
-Date:    5/14/24
-Section: 14
-E-mail:  haderh1@umbc.edu
-Description:
-  You play the game where's carmen
-"""
+        data[key] = [resolve(name, table, section, '{} "{}"'.format(where, key)) for name in names]
 
-import json
-
-def load_game(game_file_name):
-    """
-    Loads the game data from a JSON file.
-
-    Arguments:
-    - game_file_name (str): The name of the JSON file containing game data.
-
-    Returns:
-    - dict or None: The game data if loaded successfully
-    """
-    game = None
-    try:
-        with open(game_file_name) as game_file:
-            game_data = game_file.read()
-            game = json.loads(game_data)
-    except FileNotFoundError:
-        print('That file does not exist.')
-    return game
+    for loc_name, loc_data in locations.items():
+        where = 'Location "{}"'.format(loc_name)
+        if not isinstance(loc_data, dict):
+            errors.append('{} must be an object.'.format(where))
+            continue
+        loc_data.setdefault('starts-locked', False)
+        resolve_list(loc_data, 'connections', locations, 'location', where)
+
+    for section, table in (('people', people), ('clues', clues)):
+        for name, data in table.items():
+            where = '{} "{}"'.format('Person' if section == 'people' else 'Clue', name)
+            if not isinstance(data, dict):
+                errors.append('{} must be an object.'.format(where))
+                continue
+            if 'location' in data:
+                data['location'] = resolve(data['location'], locations, 'location', where)
+            elif section == 'people':
+                errors.append('{} has no "location".'.format(where))
+            text_key = 'conversation' if section == 'people' else 'clue-text'
+            if not isinstance(data.get(text_key), str):
+                errors.append('{} has no "{}".'.format(where, text_key))
+            resolve_list(data, 'unlock-locations', locations, 'location', where)
+            resolve_list(data, 'unlock-people', people, 'person', where)
+            resolve_list(data, 'unlock-clues', clues, 'clue', where)
+
+    if 'starting-location' not in game:
+        errors.append('The game has no "starting-location".')
+    else:
+        game['starting-location'] = resolve(game['starting-location'], locations, 'location',
+                                            '"starting-location"')
+    return game, errors
 
 
 def build_world(locations, people, clues):
@@ -304,6 +171,7 @@ def build_world(locations, people, clues):
         clue_data['hidden'] = True
 
 
+@instrumentation.instrumented('carmen.can_go')
 def can_go(start, end, locations, visited=None):
     """
     Checks if you can move from one place to another
@@ -322,15 +190,22 @@ def can_go(start, end, locations, visited=None):
     visited.append(start)
     if start == end:
         return True
-    if end in locations[start]['connections'] and not locations[end]['starts-locked']:
-        return True
-    for neighbor in locations[start]['connections']:
-        if neighbor not in visited and not locations[neighbor]['starts-locked']:
-            if can_go(neighbor, end, locations, visited):
+    to_visit = [start]
+    while to_visit:
+        location = to_visit.pop()
+        for neighbor in locations[location]['connections']:
+            if locations[neighbor]['starts-locked']:
+                continue
+            # like the recursive walk this replaced, an open connection to end counts even if visited
+            if neighbor == end:
                 return True
+            if neighbor not in visited:
+                visited.append(neighbor)
+                to_visit.append(neighbor)
     return False
 
 
+@instrumentation.instrumented('carmen.talk_to_person')
 def talk_to_person(person_name, current_location, locations, people, clues):
     """
     Handles interactions with characters in the game.
@@ -342,7 +217,7 @@ def talk_to_person(person_name, current_location, locations, people, clues):
     - people (dict): Dictionary containing people data.
     - clues (dict): Dictionary containing clue data.
     """
-    person_data = people.get(person_name.capitalize())
+    person_data = people.get(find_name(person_name, people))
 
     # Check if the person exists, is in the current location, and is not hidden
     if person_data and person_data['location'] == current_location and not person_data['hidden']:
@@ -357,14 +232,14 @@ def talk_to_person(person_name, current_location, locations, people, clues):
         # Unhide people
         unlock_people = person_data.get('unlock-people', [])
         for unlock_person_name in unlock_people:
-            if unlock_person_name.capitalize() in people:
-                people[unlock_person_name.capitalize()]['hidden'] = False
+            if unlock_person_name in people:
+                people[unlock_person_name]['hidden'] = False
 
         # Unhide clues
         unlock_clues = person_data.get('unlock-clues', [])
         for unlock_clue_name in unlock_clues:
-            if unlock_clue_name.capitalize() in clues:
-                clues[unlock_clue_name.capitalize()]['hidden'] = False
+            if unlock_clue_name in clues:
+                clues[unlock_clue_name]['hidden'] = False
     else:
         print("There's no one named {} here to talk to.".format(person_name))
 
@@ -380,8 +255,7 @@ def investigate_location(clue_name, current_location, locations, people, clues):
     - people (dict): Dictionary containing people data.
     - clues (dict): Dictionary containing clue data.
     """
-    # Remove "investigate" from the clue_name and capitalize the rest of the words
-    clue_name = " ".join([word.capitalize() for word in clue_name.split()])
+    clue_name = find_name(" ".join(clue_name.split()), clues) or clue_name
 
     # Check if the clue exists, is not hidden, and is unlocked at the current location
     if clue_name in clues and not clues[clue_name]['hidden'] and current_location in clues[clue_name].get(
@@ -397,14 +271,14 @@ def investigate_location(clue_name, current_location, locations, people, clues):
         # Unhide people
         unlock_people = clues[clue_name].get('unlock-people', [])
         for person_name in unlock_people:
-            if person_name.capitalize() in people:
-                people[person_name.capitalize()]['hidden'] = False
+            if person_name in people:
+                people[person_name]['hidden'] = False
 
         # Unhide other clues
         unlock_clues = clues[clue_name].get('unlock-clues', [])
         for other_clue_name in unlock_clues:
-            if other_clue_name.capitalize() in clues:
-                clues[other_clue_name.capitalize()]['hidden'] = False
+            if other_clue_name in clues:
+                clues[other_clue_name]['hidden'] = False
     else:
         print("There's no clue named '{}' here.".format(clue_name))
 
@@ -452,6 +326,57 @@ def display_people(current_location, people):
             print(person_name)
 
 
+def run_command(command, current_location, locations, people, clues, unsuccessful_searches):
+    """
+    Carries out one command of the game loop.
+
+    Arguments:
+    - command (str): The command the player typed, already lowercased.
+    - current_location (str): The current location of the player.
+    - locations (dict): Dictionary containing location data.
+    - people (dict): Dictionary containing people data.
+    - clues (dict): Dictionary containing clue data.
+    - unsuccessful_searches (int): How many times the player looked for Carmen in the wrong place.
+
+    Returns:
+    - tuple: (current_location, unsuccessful_searches, keep_playing) after the command
+    """
+    if command == "display locations":
+        display_locations(locations)
+    elif command == "display clues":
+        display_clues(current_location, clues)
+    elif command == "display people":
+        display_people(current_location, people)
+    elif command.startswith("go to ") or command.startswith("travel to "):
+        destination = command.split(" to ", 1)[1].strip()
+        destination = find_name(destination, locations) or destination.capitalize()
+        if can_go(current_location, destination, locations):
+            current_location = destination
+            print("You have traveled to {}.".format(destination))
+        else:
+            print("You can't go there from here.")
+    elif command.startswith("talk to "):
+        person_name = command[8:].strip()
+        talk_to_person(person_name, current_location, locations, people, clues)
+    elif command.startswith("investigate "):
+        clue_name = command[12:].strip()
+        investigate_location(clue_name, current_location, locations, people, clues)
+    elif command == "catch carmen":
+        if locations[current_location].get('carmen', False):
+            print("You have caught Carmen Sandiego! You win the game!")
+        else:
+            unsuccessful_searches += 1
+            print("You didn't find Carmen here.")
+            if unsuccessful_searches == 3:
+                print("You have searched unsuccessfully for Carmen three times. You lose the game.")
+    elif command == "quit" or command == "exit":
+        print("Exiting the game...")
+        return current_location, unsuccessful_searches, False
+    else:
+        print("Command not recognized.")
+    return current_location, unsuccessful_searches, True
+
+
 def carmen_sandiego(file_name):
     """
     Runs the main game loop for Where's Carmen game.
@@ -476,42 +401,12 @@ def carmen_sandiego(file_name):
     unsuccessful_searches = 0
 
     # Game loop
-    while True:
+    keep_playing = True
+    while keep_playing:
         print("\nYou are at:", current_location)
         command = input("What would you like to do? ").lower()
-
-        if command == "display locations":
-            display_locations(locations)
-        elif command == "display clues":
-            display_clues(current_location, clues)
-        elif command == "display people":
-            display_people(current_location, people)
-        elif command.startswith("go to ") or command.startswith("travel to "):
-            destination = command[6:].capitalize()
-            if can_go(current_location, destination, locations):
-                current_location = destination
-                print("You have traveled to {}.".format(destination))
-            else:
-                print("You can't go there from here.")
-        elif command.startswith("talk to "):
-            person_name = command[8:].strip()
-            talk_to_person(person_name, current_location, locations, people, clues)
-        elif command.startswith("investigate "):
-            clue_name = command[12:].strip()
-            investigate_location(clue_name, current_location, locations, people, clues)
-        elif command == "catch carmen":
-            if locations[current_location].get('carmen', False):
-                print("You have caught Carmen Sandiego! You win the game!")
-            else:
-                unsuccessful_searches += 1
-                print("You didn't find Carmen here.")
-                if unsuccessful_searches == 3:
-                    print("You have searched unsuccessfully for Carmen three times. You lose the game.")
-        elif command == "quit" or command == "exit":
-            print("Exiting the game...")
-            return
-        else:
-            print("Command not recognized.")
+        current_location, unsuccessful_searches, keep_playing = run_command(
+            command, current_location, locations, people, clues, unsuccessful_searches)
 
 if __name__ == '__main__':
     game_file_name = input('Which game do you want to play? ')
@@ -0,0 +1,406 @@
+"""
+One server process that hosts carmen, battleship and jumps_and_hits sessions.
+
+Clients connect over TCP and send one command per line. The first line picks the game:
+
+    carmen <game file>
+    battleship [seed]
+    jumps
+
+Carmen sessions can only open .game files that sit directly in game_dir (--game-dir), so clients
+cannot make the server read anything else.
+
+After that every line goes to the session, and every reply ends with a line holding a single '.'.
+Network I/O runs on an asyncio loop and CPU heavy work (simulations, the solver, the battleship AI)
+is sent to a process pool. New sessions are turned away once max_sessions are open, and
+sessions that stay idle for idle_timeout seconds are closed.
+
+    python game_server.py --port 8765
+    python game_server.py --load-test 200
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import battleship
+import carmen
+import jumps_and_hits
+
+END_OF_REPLY = '.'
+MAX_JUMPS_LENGTH = 100000  # the largest board a jumps session may ask for
+# Solving costs tens of microseconds of worker CPU per state, so the state budget bounds a solve:
+# one over 200000 states gives up within a second or two. Past 12 turns nearly every map runs out,
+# so longer horizons are refused before they reach the pool.
+MAX_SOLVE_TURNS = 12
+MAX_SOLVE_STATES = 200000
+
+
+class Session:
+    """
+    The common interface of a hosted game. start() gives the greeting, handle() takes one line
+    from the player and gives the reply, and finished is set once the game is over.
+    run_cpu(func, *args) awaits func(*args) on the process pool.
+    """
+
+    def __init__(self):
+        self.finished = False
+
+    def start(self):
+        return ''
+
+    async def handle(self, line, run_cpu):
+        raise NotImplementedError
+
+
+def _captured(func, *args):
+    """
+    :return: (what func printed, what func returned)
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = func(*args)
+    return output.getvalue(), result
+
+
+class CarmenSession(Session):
+    def __init__(self, file_name):
+        super().__init__()
+        output, game = _captured(carmen.load_game, file_name)
+        if not game:
+            raise ValueError(output.strip() or f'Could not load {file_name}')
+        self.locations = game.get('locations', {})
+        self.people = game.get('people', {})
+        self.clues = game.get('clues', {})
+        self.current_location = game.get('starting-location', '')
+        self.unsuccessful_searches = 0
+        carmen.build_world(self.locations, self.people, self.clues)
+
+    def start(self):
+        return f'You are at: {self.current_location}'
+
+    async def handle(self, line, run_cpu):
+        output, (self.current_location, self.unsuccessful_searches, keep_playing) = _captured(
+            carmen.run_command, line.lower(), self.current_location, self.locations, self.people, self.clues,
+            self.unsuccessful_searches)
+        self.finished = not keep_playing
+        if keep_playing:
+            output += f'\nYou are at: {self.current_location}'
+        return output.rstrip('\n')
+
+
+def computer_shot(ai, seed):
+    """
+    Picks where the computer fires next, run on the process pool.
+
+    :param ai: the computer's BattleshipAI
+    :param seed: the seed of the AI's random choices
+    :return: (x, y, mode, nodes searched) of the chosen shot
+    """
+    x, y = ai.choose_shot(random.Random(seed))
+    return x, y, ai.last_mode, ai.nodes_searched
+
+
+class BattleshipSession(Session):
+    """
+    The player against the computer, both fleets are placed at random.
+    """
+
+    def __init__(self, seed=None):
+        super().__init__()
+        self.rng = random.Random(seed)
+        self.player_board = battleship.create_board()
+        self.computer_board = battleship.create_board()
+        battleship.place_ships_randomly(self.player_board, self.rng)
+        battleship.place_ships_randomly(self.computer_board, self.rng)
+        self.player_shots = battleship.create_board()
+        self.ai = battleship.BattleshipAI()
+
+    def start(self):
+        output, _ = _captured(battleship.display_ship_placement_board, self.player_board)
+        return 'Your fleet:\n' + output + 'Enter x y coordinates to fire:'
+
+    async def handle(self, line, run_cpu):
+        coordinates = line.split()
+        if len(coordinates) != 2 or not all(coordinate.isdigit() for coordinate in coordinates):
+            return 'Invalid input, try again.'
+        x, y = int(coordinates[0]), int(coordinates[1])
+        if not (0 <= x < battleship.BOARD_SIZE and 0 <= y < battleship.BOARD_SIZE) or \
+                self.player_shots[x][y] != ' ':
+            return 'Invalid coordinates or already shot, try again.'
+
+        replies = []
+        hit, ship_hit = battleship.check_shot(self.computer_board, x, y)
+        self.player_shots[x][y] = 'X' if hit else '-'
+        replies.append(f'Hit! You hit the {ship_hit}.' if hit else 'Miss!')
+        if battleship.check_win_condition(self.computer_board):
+            self.finished = True
+            return '\n'.join(replies + ['You win!'])
+
+        x, y, _, _ = await run_cpu(computer_shot, self.ai, self.rng.random())
+        hit, ship_hit = battleship.check_shot(self.player_board, x, y)
+        self.ai.record_shot(x, y, hit, ship_hit)
+        replies.append(f'The computer fires at {x} {y}: ' + (f'it hit your {ship_hit}.' if hit else 'miss.'))
+        if battleship.check_win_condition(self.player_board):
+            self.finished = True
+            replies.append('The computer wins!')
+        return '\n'.join(replies)
+
+
+def _jumps_map(length, seed):
+    # generate_random_map would leave seed 0 unseeded and reseed the worker's global generator
+    return jumps_and_hits.map_from_arrays(*jumps_and_hits.generate_map_arrays(length, seed))
+
+
+def play_jumps(length, seed, score_mode):
+    game_map = _jumps_map(length, seed)
+    return jumps_and_hits.summarize_game(game_map, seed, score_mode)
+
+
+def analyze_jumps(length, seed):
+    report = jumps_and_hits.analyze_map(_jumps_map(length, seed))
+    report['trap_regions'] = len(report['trap_regions'])
+    return report
+
+
+def solve_jumps(length, seed, turns_left):
+    solver = jumps_and_hits.SkipRollSolver(_jumps_map(length, seed), turns_left, max_entries=MAX_SOLVE_STATES)
+    return solver.expected_score(), solver.stats()
+
+
+class JumpsSession(Session):
+    """
+    Headless jumps_and_hits: every command plays, analyzes or solves a generated map on the pool.
+    """
+
+    def start(self):
+        return 'Commands: play <size> <seed>, analyze <size> <seed>, solve <size> <seed> [turns], quit'
+
+    async def handle(self, line, run_cpu):
+        words = line.lower().split()
+        if words == ['quit'] or words == ['exit']:
+            self.finished = True
+            return 'Exiting the game...'
+        if len(words) < 3 or not all(word.isdigit() for word in words[1:]):
+            return 'Command not recognized.'
+        length, seed = int(words[1]), int(words[2])
+        if not 2 <= length <= MAX_JUMPS_LENGTH:
+            return f'The board needs between 2 and {MAX_JUMPS_LENGTH} squares.'
+        if words[0] == 'play':
+            summary = await run_cpu(play_jumps, length, seed, 'exact')
+            return (f"Final Pos: {summary['final_position']} Final Score: {summary['final_score']} "
+                    f"Steps: {summary['steps']} Halted: {summary['halted']}")
+        if words[0] == 'analyze':
+            return str(await run_cpu(analyze_jumps, length, seed))
+        if words[0] == 'solve':
+            turns_left = int(words[3]) if len(words) > 3 else 8
+            if turns_left > MAX_SOLVE_TURNS:
+                return f'Solve at most {MAX_SOLVE_TURNS} turns.'
+            expected_score, stats = await run_cpu(solve_jumps, length, seed, turns_left)
+            return (f"Expected score: {expected_score:.2f} Shared states: {stats['shared_state_rate']:.2%} "
+                    f"Solve time: {stats['solve_time']:.3f}s")
+        return 'Command not recognized.'
+
+
+def open_session(line, game_dir='.'):
+    """
+    :param line: the first line a client sends
+    :param game_dir: the directory carmen .game files are opened from
+    :return: the new Session it asks for
+    """
+    words = line.split(maxsplit=1)
+    game = words[0].lower() if words else ''
+    if game == 'carmen' and len(words) == 2:
+        file_name = words[1].strip()
+        # a bare file name only, anything with a directory part could escape game_dir
+        if (not file_name.endswith('.game') or os.path.basename(file_name) != file_name
+                or not os.path.isfile(os.path.join(game_dir, file_name))):
+            raise ValueError(f'No such game: {file_name}')
+        return CarmenSession(os.path.join(game_dir, file_name))
+    if game == 'battleship':
+        return BattleshipSession(int(words[1]) if len(words) == 2 and words[1].strip().isdigit() else None)
+    if game == 'jumps':
+        return JumpsSession()
+    raise ValueError('Start with: carmen <game file>, battleship [seed] or jumps')
+
+
+class GameServer:
+    """
+    Accepts connections, admits at most max_sessions at once, closes sessions idle for longer
+    than idle_timeout seconds and runs CPU work on a pool of processes. Carmen games are opened
+    from game_dir.
+    """
+
+    def __init__(self, max_sessions=1000, idle_timeout=300, processes=None, max_cpu_jobs=None, game_dir='.'):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.game_dir = game_dir
+        # forked workers would inherit open client sockets and keep them alive after the server closes them
+        self.pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'))
+        # queueing more CPU jobs than this only adds latency, so sessions wait for a slot instead
+        self.cpu_slots = asyncio.Semaphore(max_cpu_jobs or 4 * (processes or os.cpu_count() or 1))
+        self.last_active = {}
+        self.busy = set()  # sessions waiting on their reply, they are never idle
+        self.sessions_started = 0
+        self.sessions_rejected = 0
+        self.sessions_evicted = 0
+
+    async def run_cpu(self, func, *args):
+        async with self.cpu_slots:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    async def send(self, writer, text):
+        writer.write((text + '\n' + END_OF_REPLY + '\n').encode())
+        await writer.drain()
+
+    async def serve_client(self, reader, writer):
+        if len(self.last_active) >= self.max_sessions:
+            self.sessions_rejected += 1
+            await self.send(writer, 'The server is full, try again later.')
+            writer.close()
+            return
+
+        self.last_active[writer] = time.monotonic()
+        try:
+            session = None
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # longer than the stream limit, the reader has already dropped it
+                    await self.send(writer, 'Command not recognized.')
+                    continue
+                if not line:
+                    break
+                self.last_active[writer] = time.monotonic()
+                line = line.decode(errors='replace').strip()
+                if session is None:
+                    try:
+                        session = open_session(line, self.game_dir)
+                    except ValueError as error:
+                        await self.send(writer, str(error))
+                        continue
+                    self.sessions_started += 1
+                    await self.send(writer, session.start())
+                    continue
+                self.busy.add(writer)
+                try:
+                    reply = await session.handle(line, self.run_cpu)
+                except Exception as error:
+                    # a failed command, often raised in a pool worker, must not take the connection down
+                    reply = f'Error: {error}'
+                finally:
+                    self.busy.discard(writer)
+                    self.last_active[writer] = time.monotonic()
+                await self.send(writer, reply)
+                if session.finished:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.last_active.pop(writer, None)
+            self.busy.discard(writer)
+            writer.close()
+
+    async def evict_idle_sessions(self):
+        while True:
+            await asyncio.sleep(min(self.idle_timeout / 2, 30))
+            now = time.monotonic()
+            for writer, last_active in list(self.last_active.items()):
+                if writer not in self.busy and now - last_active > self.idle_timeout:
+                    self.sessions_evicted += 1
+                    self.last_active.pop(writer, None)
+                    # never drain here, one client that stopped reading would stall eviction for everyone
+                    writer.write(('Session closed for inactivity.\n' + END_OF_REPLY + '\n').encode())
+                    if writer.transport.get_write_buffer_size():
+                        writer.transport.abort()
+                    else:
+                        writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765, ready=None):
+        server = await asyncio.start_server(self.serve_client, host, port)
+        evictor = asyncio.create_task(self.evict_idle_sessions())
+        if ready is not None:
+            ready.set_result(server.sockets[0].getsockname()[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+
+async def _load_test_client(port, requests, seed):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+    async def ask(line):
+        writer.write((line + '\n').encode())
+        await writer.drain()
+        while (await reader.readline()).decode().rstrip('\n') != END_OF_REPLY:
+            pass
+
+    await ask('jumps')
+    for request in range(requests):
+        await ask(f'play 1000 {seed * requests + request + 1}')
+    await ask('quit')
+    writer.close()
+
+
+async def load_test(sessions, requests=5, processes=None, concurrency=100):
+    """
+    Starts a local server and runs sessions jumps clients against it, at most concurrency at a time.
+
+    :return: a dict with 'sessions', 'seconds', 'sessions_per_second' and 'sessions_per_core'
+    """
+    server = GameServer(max_sessions=sessions, processes=processes)
+    ready = asyncio.get_running_loop().create_future()
+    serving = asyncio.create_task(server.serve(port=0, ready=ready))
+    port = await ready
+
+    limit = asyncio.Semaphore(concurrency)
+
+    async def client(seed):
+        async with limit:
+            await _load_test_client(port, requests, seed)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(client(seed) for seed in range(sessions)))
+    seconds = time.perf_counter() - start_time
+    serving.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await serving
+
+    cores = processes or os.cpu_count() or 1
+    return {'sessions': sessions, 'seconds': seconds, 'sessions_per_second': sessions / seconds,
+            'sessions_per_core': sessions / seconds / cores}
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Multi game server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-sessions', type=int, default=1000)
+    parser.add_argument('--idle-timeout', type=float, default=300)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--game-dir', default='.', help='the directory carmen .game files are opened from')
+    parser.add_argument('--load-test', type=int, metavar='SESSIONS',
+                        help='run this many local jumps sessions against a fresh server and report the rate')
+    options = parser.parse_args(arguments)
+
+    if options.load_test:
+        result = asyncio.run(load_test(options.load_test, processes=options.processes))
+        print(f"{result['sessions']} sessions in {result['seconds']:.2f}s: "
+              f"{result['sessions_per_second']:.1f} sessions/sec, {result['sessions_per_core']:.1f} per core")
+        return
+    server = GameServer(options.max_sessions, options.idle_timeout, options.processes, game_dir=options.game_dir)
+    asyncio.run(server.serve(options.host, options.port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Opt-in timing and counters for the games.
+
+Set the environment variable GAMES_INSTRUMENT=1 (or call enable() before the games are
+imported) to turn it on. When it is off the instrumented decorator hands back the function
+unchanged and the step loops only check the ENABLED flag, so there is nothing to pay.
+
+Every instrumented call records its latency in a histogram with power of two nanosecond
+buckets, the net number of memory blocks it allocated and how many times it ran. At exit
+(or when export() is called) everything is written to GAMES_INSTRUMENT_FILE, by default
+instrumentation.prom, in the Prometheus text exposition format.
+"""
+
+import atexit
+import functools
+import os
+import sys
+import time
+
+ENABLED = os.environ.get('GAMES_INSTRUMENT', '') not in ('', '0')
+EXPORT_FILE = os.environ.get('GAMES_INSTRUMENT_FILE', 'instrumentation.prom')
+
+# Histogram buckets go 1us, 2us, 4us ... about 1s, anything slower lands in +Inf
+BUCKET_BOUNDS_NS = [1000 << i for i in range(21)]
+
+
+class Metric:
+    """
+    The latency histogram, allocation count and call count of one instrumented name.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.bucket_counts = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.allocated_blocks = 0
+
+    def record(self, elapsed_ns, allocated_blocks=0):
+        """
+        :param elapsed_ns: how long one call took in nanoseconds
+        :param allocated_blocks: the net number of memory blocks the call allocated
+        """
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.allocated_blocks += allocated_blocks
+        bucket = max((elapsed_ns - 1) // 1000, 0).bit_length()
+        self.bucket_counts[min(bucket, len(BUCKET_BOUNDS_NS))] += 1
+
+
+_metrics = {}
+_started_ns = time.perf_counter_ns()
+
+
+def enable(export_file=None):
+    """
+    Turns instrumentation on. Functions decorated before this call stay uninstrumented, so
+    call it before importing the game modules.
+
+    :param export_file: where export() writes to by default
+    """
+    global ENABLED, EXPORT_FILE
+    ENABLED = True
+    if export_file:
+        EXPORT_FILE = export_file
+
+
+def get_metric(name):
+    """
+    :return: the Metric recorded under name, created the first time it is asked for
+    """
+    metric = _metrics.get(name)
+    if metric is None:
+        metric = _metrics[name] = Metric(name)
+    return metric
+
+
+def instrumented(name):
+    """
+    Decorator that records the latency and allocations of every call under name.
+    When instrumentation is disabled the function is returned untouched.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+        metric = get_metric(name)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            blocks = sys.getallocatedblocks()
+            start_ns = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metric.record(time.perf_counter_ns() - start_ns, sys.getallocatedblocks() - blocks)
+        return wrapper
+    return decorator
+
+
+def reset():
+    """
+    Forgets everything recorded so far.
+    """
+    global _started_ns
+    _metrics.clear()
+    _started_ns = time.perf_counter_ns()
+
+
+def snapshot():
+    """
+    :return: a dict mapping each name to its 'count', 'total_seconds', 'max_seconds',
+        'allocated_blocks' and 'throughput' (calls per second since enabling or reset)
+    """
+    wall_seconds = max((time.perf_counter_ns() - _started_ns) / 1e9, 1e-9)
+    return {name: {'count': metric.count, 'total_seconds': metric.total_ns / 1e9,
+                   'max_seconds': metric.max_ns / 1e9, 'allocated_blocks': metric.allocated_blocks,
+                   'throughput': metric.count / wall_seconds}
+            for name, metric in _metrics.items()}
+
+
+def export(path=None):
+    """
+    Writes every metric to a file in the Prometheus text exposition format.
+
+    :param path: the file to write, EXPORT_FILE if not given
+    """
+    wall_seconds = max((time.perf_counter_ns() - _started_ns) / 1e9, 1e-9)
+    lines = ['# HELP games_call_duration_seconds Latency of instrumented game functions.',
+             '# TYPE games_call_duration_seconds histogram']
+    for name, metric in sorted(_metrics.items()):
+        cumulative = 0
+        for bound_ns, bucket_count in zip(BUCKET_BOUNDS_NS, metric.bucket_counts):
+            cumulative += bucket_count
+            lines.append(f'games_call_duration_seconds_bucket{{name="{name}",le="{bound_ns / 1e9:g}"}} {cumulative}')
+        lines.append(f'games_call_duration_seconds_bucket{{name="{name}",le="+Inf"}} {metric.count}')
+        lines.append(f'games_call_duration_seconds_sum{{name="{name}"}} {metric.total_ns / 1e9:.9f}')
+        lines.append(f'games_call_duration_seconds_count{{name="{name}"}} {metric.count}')
+
+    # net blocks go down when a call frees more than it allocates, so this is a gauge and not a counter
+    lines += ['# HELP games_allocated_blocks_net Net memory blocks allocated by instrumented game functions.',
+              '# TYPE games_allocated_blocks_net gauge']
+    for name, metric in sorted(_metrics.items()):
+        lines.append(f'games_allocated_blocks_net{{name="{name}"}} {metric.allocated_blocks}')
+
+    lines += ['# HELP games_calls_per_second Calls per second since instrumentation started.',
+              '# TYPE games_calls_per_second gauge']
+    for name, metric in sorted(_metrics.items()):
+        lines.append(f'games_calls_per_second{{name="{name}"}} {metric.count / wall_seconds:.3f}')
+
+    with open(path or EXPORT_FILE, 'w') as export_file:
+        export_file.write('\n'.join(lines) + '\n')
+
+
+def _export_at_exit():
+    if ENABLED and _metrics:
+        export()
+
+
+atexit.register(_export_at_exit)
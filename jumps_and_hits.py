@@ -1,9 +1,36 @@
+import argparse
+import math
+import mmap
 import random
+import struct
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentation
 
 GRID_WIDTH = 8
 GRID_HEIGHT = 3
 DICE_SIDES = 6
 
+# Score arithmetic modes used by math_command
+SCORE_MODES = ['exact', 'saturate', 'modular']
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+SCORE_MODULUS = 2 ** 61 - 1
+
+# Opcodes of the array map representation, in the order of OPCODE_WEIGHTS
+OPCODES = ['nop', 'add', 'sub', 'mul', 'jmp', 'hlt']
+OPCODE_WEIGHTS = [5, 2, 2, 2, 3, 1]
+NOP, ADD, SUB, MUL, JMP, HLT = range(len(OPCODES))
+
+# Map corpus file: header (magic, version, map count, map length), then every opcode as one byte,
+# padding to a multiple of 4, then every operand as a little endian int32.
+CORPUS_MAGIC = b'JHMC'
+CORPUS_VERSION = 1
+CORPUS_HEADER = struct.Struct('<4sIII')
+
 
 def generate_random_map(length, the_seed=0):
     """
@@ -22,6 +49,187 @@ def generate_random_map(length, the_seed=0):
     return ['nop'] + map_list + ['hlt']
 
 
+def map_seed(seed, index):
+    """
+    :param seed: the seed of a whole batch or corpus of maps
+    :param index: the number of the map inside the batch
+    :return: the seed of that one map, every (seed, index) pair gets its own random stream
+    """
+    return (seed << 32) | index
+
+
+def generate_map_arrays(length, seed=0):
+    """
+    Generates a map as two parallel arrays instead of a list of strings. It uses its own
+    random.Random so it never touches the global generator and is safe to call from threads.
+
+    :param length: the length of the map
+    :param seed: the seed of the map
+    :return: (opcodes, operands), an array('B') of indices into OPCODES and an array('i') of
+        the points of add/sub/mul or the target of jmp (0 for nop and hlt).
+    :raises ValueError: if length is less than 2
+    """
+    if length < 2:
+        raise ValueError(f'A map needs at least 2 squares (nop and hlt), got {length}')
+    rng = random.Random(seed)
+    inner = length - 2
+    opcodes = array('B', [NOP])
+    opcodes.extend(rng.choices(range(len(OPCODES)), weights=OPCODE_WEIGHTS, k=inner))
+    opcodes.append(HLT)
+
+    points = rng.choices(range(1, 101), k=inner)
+    targets = rng.choices(range(length), k=inner)
+    operands = array('i', bytes(4 * length))
+    for i in range(inner):
+        opcode = opcodes[i + 1]
+        if opcode == JMP:
+            operands[i + 1] = targets[i]
+        elif ADD <= opcode <= MUL:
+            operands[i + 1] = points[i]
+    return opcodes, operands
+
+
+def map_from_arrays(opcodes, operands):
+    """
+    :param opcodes: the opcode array of a map (anything indexable, a memoryview works too)
+    :param operands: the matching operand array
+    :return: the map as the list of instructions that play_game and display_board expect
+    """
+    return [OPCODES[opcode] if opcode == NOP or opcode == HLT else f'{OPCODES[opcode]} {operand}'
+            for opcode, operand in zip(opcodes, operands)]
+
+
+def generate_map_batch(count, length, seed=0, start=0):
+    """
+    Generates maps start .. start + count - 1 of a batch, each from its own map_seed stream.
+
+    :return: (opcodes, operands), the maps concatenated one after another in two flat arrays
+    """
+    opcodes = array('B')
+    operands = array('i')
+    for index in range(start, start + count):
+        map_opcodes, map_operands = generate_map_arrays(length, map_seed(seed, index))
+        opcodes.extend(map_opcodes)
+        operands.extend(map_operands)
+    return opcodes, operands
+
+
+def _generate_corpus_chunk(arguments):
+    count, length, seed, start = arguments
+    opcodes, operands = generate_map_batch(count, length, seed, start)
+    if sys.byteorder != 'little':
+        operands.byteswap()
+    return start, opcodes.tobytes(), operands.tobytes()
+
+
+def write_map_corpus(path, count, length, seed=0, processes=None, chunk_size=1000):
+    """
+    Writes count maps of the given length to a memory mappable corpus file. The maps are
+    split in chunks across a process pool, each map is seeded by map_seed so the file is
+    byte for byte the same whatever the number of processes.
+
+    :param path: the corpus file to write
+    :param count: how many maps to generate
+    :param length: the length of every map
+    :param seed: the seed of the corpus
+    :param processes: the number of worker processes, 1 generates everything in this process
+    :param chunk_size: how many maps each worker generates per task
+    :raises ValueError: if length is less than 2
+    """
+    if length < 2:
+        raise ValueError(f'A map needs at least 2 squares (nop and hlt), got {length}')
+    opcode_section = CORPUS_HEADER.size
+    operand_section = opcode_section + count * length
+    operand_section += -operand_section % 4
+    chunks = [(min(chunk_size, count - start), length, seed, start) for start in range(0, count, chunk_size)]
+
+    with open(path, 'wb') as corpus_file:
+        corpus_file.write(CORPUS_HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, count, length))
+        corpus_file.truncate(operand_section + 4 * count * length)
+        if processes == 1:
+            results = map(_generate_corpus_chunk, chunks)
+            _write_corpus_chunks(corpus_file, results, length, opcode_section, operand_section)
+        else:
+            with ProcessPoolExecutor(processes) as pool:
+                results = pool.map(_generate_corpus_chunk, chunks)
+                _write_corpus_chunks(corpus_file, results, length, opcode_section, operand_section)
+
+
+def _write_corpus_chunks(corpus_file, results, length, opcode_section, operand_section):
+    for start, opcode_bytes, operand_bytes in results:
+        corpus_file.seek(opcode_section + start * length)
+        corpus_file.write(opcode_bytes)
+        corpus_file.seek(operand_section + 4 * start * length)
+        corpus_file.write(operand_bytes)
+
+
+class MapCorpus:
+    """
+    Read only view of a corpus written by write_map_corpus. The file is memory mapped, so
+    opening it is instant and maps are only read from disk when they are used.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as corpus_file:
+            self._mmap = mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.length = CORPUS_HEADER.unpack_from(self._mmap)
+        if magic != CORPUS_MAGIC or version != CORPUS_VERSION:
+            self._mmap.close()
+            raise ValueError(f'{path} is not a version {CORPUS_VERSION} map corpus')
+        opcode_section = CORPUS_HEADER.size
+        operand_section = opcode_section + self.count * self.length
+        operand_section += -operand_section % 4
+        view = memoryview(self._mmap)
+        self._opcodes = view[opcode_section:opcode_section + self.count * self.length]
+        self._operands = view[operand_section:operand_section + 4 * self.count * self.length]
+        if sys.byteorder == 'little':
+            self._operands = self._operands.cast('i')
+
+    def __len__(self):
+        return self.count
+
+    def arrays(self, index):
+        """
+        :param index: the number of the map in the corpus
+        :return: (opcodes, operands) of that map, without copying on little endian machines.
+            They are views into the mapped file, see close.
+        """
+        if self._mmap is None:
+            raise ValueError('the map corpus is closed')
+        if not 0 <= index < self.count:
+            raise IndexError('map index out of range')
+        start = index * self.length
+        if sys.byteorder == 'little':
+            return self._opcodes[start:start + self.length], self._operands[start:start + self.length]
+        operands = array('i', self._operands[4 * start:4 * (start + self.length)])
+        operands.byteswap()
+        return self._opcodes[start:start + self.length], operands
+
+    def __getitem__(self, index):
+        return map_from_arrays(*self.arrays(index))
+
+    def close(self):
+        """
+        Unmaps the file. Drop the views returned by arrays() first: if any of them is still
+        alive it keeps working, and the mapping is only freed once the last of them is gone.
+        """
+        if self._mmap is None:
+            return
+        self._opcodes.release()
+        self._operands.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # views from arrays() still export the mapping, it goes away with the last of them
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 def make_grid(table_size):
     """
     :param table_size: this needs to be the length of the map
@@ -70,9 +278,17 @@ def roll_dice():
     """
     return random.randint(1, DICE_SIDES)
 
-def math_command(score, command):
+def math_command(score, command, score_mode='exact'):
     """
     Handles math commands (add, sub, mul) and updates the score.
+
+    :param score: the current score
+    :param command: the add/sub/mul instruction to apply
+    :param score_mode: 'exact' keeps an unbounded int, 'saturate' clamps to the int64 range,
+        'modular' reduces the score modulo SCORE_MODULUS into the symmetric range
+        -(SCORE_MODULUS // 2) .. SCORE_MODULUS // 2, so small scores keep their value and sign
+        and it never grows past 61 bits.
+    :return: the updated score
     """
     operation, value = command.split()
     value = int(value)
@@ -82,8 +298,86 @@ def math_command(score, command):
         score -= value
     elif operation == 'mul':
         score *= value
+
+    if score_mode == 'saturate':
+        if score > INT64_MAX:
+            score = INT64_MAX
+        elif score < INT64_MIN:
+            score = INT64_MIN
+    elif score_mode == 'modular':
+        score %= SCORE_MODULUS
+        if score > SCORE_MODULUS // 2:
+            score -= SCORE_MODULUS
+    elif score_mode != 'exact':
+        raise ValueError(f'Unknown score mode {score_mode}, expected one of {SCORE_MODES}')
     return score
 
+
+class LogScoreTracker:
+    """
+    Follows the score in the log domain (sign and natural log of the magnitude), so long games
+    can be analysed without ever building the huge integer that the exact score would become.
+    """
+
+    def __init__(self):
+        self.sign = 0
+        self.log_magnitude = float('-inf')
+
+    def value(self):
+        """
+        :return: the tracked score as a float (may be inf once the score no longer fits in a float)
+        """
+        if self.sign == 0:
+            return 0.0
+        if self.log_magnitude > 709:
+            return self.sign * float('inf')
+        return self.sign * math.exp(self.log_magnitude)
+
+    def log10(self):
+        """
+        :return: log base 10 of the magnitude of the score, -inf if the score is 0
+        """
+        return self.log_magnitude / math.log(10)
+
+    def apply(self, command):
+        """
+        Applies an add/sub/mul instruction to the tracked score.
+
+        :param command: the math instruction, for example 'mul 12'
+        """
+        operation, value = command.split()
+        value = int(value)
+        if operation == 'mul':
+            if value == 0 or self.sign == 0:
+                self.sign, self.log_magnitude = 0, float('-inf')
+            else:
+                self.sign *= 1 if value > 0 else -1
+                self.log_magnitude += math.log(abs(value))
+        elif operation == 'add' or operation == 'sub':
+            self._add(value if operation == 'add' else -value)
+
+    def _add(self, value):
+        if value == 0:
+            return
+        if self.sign == 0:
+            self.sign = 1 if value > 0 else -1
+            self.log_magnitude = math.log(abs(value))
+            return
+        log_value = math.log(abs(value))
+        # once the score dwarfs the operand the addition is lost in float precision anyway
+        if self.log_magnitude - log_value > 40:
+            return
+        if log_value - self.log_magnitude > 40:
+            self.sign = 1 if value > 0 else -1
+            self.log_magnitude = log_value
+            return
+        total = self.sign * math.exp(self.log_magnitude) + value
+        if total == 0:
+            self.sign, self.log_magnitude = 0, float('-inf')
+        else:
+            self.sign = 1 if total > 0 else -1
+            self.log_magnitude = math.log(abs(total))
+
 def jump(position, command):
     """
     Handles jump commands and updates the position.
@@ -91,61 +385,574 @@ def jump(position, command):
     _, new_position = command.split()
     return int(new_position)
 
-def display_board(game_map):
+def jump_targets(game_map):
     """
-    displays the board
+    Parses every jmp instruction of a map once.
+
     :param game_map: a list representing the game map.
+    :return: a list where entry i is the cell the jmp at i goes to, or -1 if cell i is not a jmp
     """
-    board_size = len(game_map)
-    display_grid = make_grid(board_size)
+    size = len(game_map)
+    return [int(command[4:]) % size if command[:3] == 'jmp' else -1 for command in game_map]
 
-    index = 0
-    for row_index in range(board_size):
-        for col_index in range(board_size):
-            if index < len(game_map):  # Check if index is within game_map range
-                fill_grid_square(display_grid, board_size, index, f"{index}\n{game_map[index]}")
-            index += 1
 
-    for row in display_grid:
-        print(''.join(row))
+def resolve_jumps(game_map, targets=None):
+    """
+    Follows every chain of jmp instructions to the cell it finally lands on, compressing each
+    chain as it is walked so every cell is visited a constant number of times.
+
+    :param game_map: a list representing the game map.
+    :param targets: jump_targets(game_map), if it has already been worked out
+    :return: a list where entry i is the first non-jmp cell reached by following jumps from i
+        (i itself if it is not a jmp), or -1 if the chain from i runs into a cycle of jumps.
+    """
+    if targets is None:
+        targets = jump_targets(game_map)
+    size = len(game_map)
+    resolved = [None] * size
+    for start in range(size):
+        chain = []
+        position = start
+        while resolved[position] is None and targets[position] != -1:
+            resolved[position] = -2  # on the chain currently being walked
+            chain.append(position)
+            position = targets[position]
+        if resolved[position] is None:
+            resolved[position] = position
+        final = resolved[position]
+        if final == -2:
+            final = -1  # walked back into the current chain
+        for chained_position in chain:
+            resolved[chained_position] = final
+    return resolved
+
+
+def landing_positions(game_map, targets=None):
+    """
+    :param game_map: a list representing the game map.
+    :param targets: jump_targets(game_map), if it has already been worked out
+    :return: a list where entry i is where the player ends the turn after the dice moved them
+        onto cell i, play_game follows a single jmp and no further.
+    """
+    if targets is None:
+        targets = jump_targets(game_map)
+    return [position if target == -1 else target for position, target in enumerate(targets)]
 
 
-def play_game(game_map):
+def analyze_map(game_map, max_turns=1000):
     """
-    Main function to play the game with the given game map.
+    Statically checks a map for boards that never reach hlt or take pathologically long to.
+    Runs in time linear in the length of the map, every instruction is parsed once.
+
+    :param game_map: a list representing the game map.
+    :param max_turns: boards whose fewest possible turns to hlt exceed this are flagged
+    :return: a dict report with
+        'jump_cycles': the number of cells whose jmp chain loops forever,
+        'longest_jump_chain': the most jmp instructions in a row that chain into each other (outside cycles),
+        'halt_reachable': whether hlt can be reached from the start at all,
+        'min_turns_to_halt': the fewest turns from the start to hlt (None if unreachable),
+        'trap_regions': lists of cells (strongly connected, reachable from the start) that can never reach hlt,
+        'pathological': True if a trap region exists or hlt is further than max_turns away.
     """
+    size = len(game_map)
+    targets = jump_targets(game_map)
+    resolved = resolve_jumps(game_map, targets)
+    jump_cycles = resolved.count(-1)
+
+    # longest chain of jmp -> jmp, counted once per cell with memoised depths
+    chain_depth = [0] * size
+    for start in range(size):
+        if chain_depth[start] or targets[start] == -1 or resolved[start] == -1:
+            continue
+        chain = []
+        position = start
+        while targets[position] != -1 and not chain_depth[position]:
+            chain.append(position)
+            position = targets[position]
+        depth = chain_depth[position]
+        for chained_position in reversed(chain):
+            depth += 1
+            chain_depth[chained_position] = depth
+    longest_jump_chain = max(chain_depth, default=0)
+
+    # one edge per dice face: the successors of position are wrapped[position + 1:position + 1 + DICE_SIDES]
+    landing = landing_positions(game_map, targets)
+    wrapped = landing + (landing * DICE_SIDES)[:DICE_SIDES]
+    halting = [command.lower() == 'hlt' for command in game_map]
+
+    # breadth first search from the start, the game stops as soon as it ends a turn on hlt
+    distance = [-1] * size
+    distance[0] = 0
+    frontier = [0]
+    min_turns_to_halt = None
+    turns = 0
+    while frontier:
+        turns += 1
+        next_frontier = []
+        for position in frontier:
+            if halting[position]:
+                continue
+            for successor in wrapped[position + 1:position + 1 + DICE_SIDES]:
+                if distance[successor] == -1:
+                    distance[successor] = turns
+                    if halting[successor] and min_turns_to_halt is None:
+                        min_turns_to_halt = turns
+                    next_frontier.append(successor)
+        frontier = next_frontier
+
+    # reverse search from every hlt cell finds the cells that can still finish. A turn ends on
+    # cell q when the dice land on q itself (q not a jmp) or on a jmp to q, one to six cells ahead.
+    jumps_into = {}
+    for position, target in enumerate(targets):
+        if target != -1:
+            jumps_into.setdefault(target, []).append(position)
+    can_halt = list(halting)
+    stack = [position for position in range(size) if halting[position]]
+    while stack:
+        position = stack.pop()
+        entered_from = jumps_into.get(position, [])
+        if targets[position] == -1:
+            entered_from = entered_from + [position]
+        for entered in entered_from:
+            if entered >= DICE_SIDES:
+                predecessors = range(entered - DICE_SIDES, entered)
+            else:
+                predecessors = [(entered - roll) % size for roll in range(1, DICE_SIDES + 1)]
+            for predecessor in predecessors:
+                if not can_halt[predecessor]:
+                    can_halt[predecessor] = True
+                    stack.append(predecessor)
+
+    trapped = [position for position in range(size) if distance[position] != -1 and not can_halt[position]]
+    successors = {position: wrapped[position + 1:position + 1 + DICE_SIDES] for position in trapped}
+    trap_regions = _strongly_connected_regions(trapped, successors)
+
+    return {
+        'jump_cycles': jump_cycles,
+        'longest_jump_chain': longest_jump_chain,
+        'halt_reachable': min_turns_to_halt is not None,
+        'min_turns_to_halt': min_turns_to_halt,
+        'trap_regions': trap_regions,
+        'pathological': bool(trap_regions) or min_turns_to_halt is None or min_turns_to_halt > max_turns,
+    }
+
+
+def _strongly_connected_regions(cells, successors):
+    """
+    Iterative Tarjan's algorithm restricted to the given cells.
+
+    :return: the strongly connected components of the cells that contain a cycle, as sorted lists
+    """
+    in_region = set(cells)
+    index_of = {}
+    low_link = {}
+    on_stack = set()
+    stack = []
+    regions = []
+    next_index = 0
+    for root in cells:
+        if root in index_of:
+            continue
+        work = [(root, iter(successors[root]))]
+        index_of[root] = low_link[root] = next_index
+        next_index += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            position, neighbours = work[-1]
+            advanced = False
+            for successor in neighbours:
+                if successor not in in_region:
+                    continue
+                if successor not in index_of:
+                    index_of[successor] = low_link[successor] = next_index
+                    next_index += 1
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(successors[successor])))
+                    advanced = True
+                    break
+                if successor in on_stack:
+                    low_link[position] = min(low_link[position], index_of[successor])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low_link[parent] = min(low_link[parent], low_link[position])
+            if low_link[position] == index_of[position]:
+                region = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    region.append(member)
+                    if member == position:
+                        break
+                if len(region) > 1 or position in successors[position]:
+                    regions.append(sorted(region))
+    return regions
+
+
+def render_board(game_map, center=None, radius=None):
+    """
+    Renders the board one line at a time, giving the same picture as make_grid and
+    fill_grid_square without building the whole grid. Each serpentine cell position is worked
+    out once and written into a line buffer that is reused for every line.
+
+    :param game_map: a list representing the game map.
+    :param center: optional index to render a viewport around, for example the current position
+    :param radius: how many squares to show on each side of center (rows and columns)
+    :return: a generator of the display lines
+    """
+    board_size = len(game_map)
+    if not board_size:
+        return
+    int_square_root = math.isqrt(board_size)
+    if int_square_root * int_square_root < board_size:
+        int_square_root += 1
+    table_height = int_square_root
+    if int_square_root * (int_square_root - 1) >= board_size:
+        table_height -= 1
+
+    first_row, last_row = 0, table_height - 1
+    first_col, last_col = 0, int_square_root - 1
+    if center is not None and radius is not None:
+        center_row = center // int_square_root
+        center_col = center % int_square_root
+        if center_row % 2:
+            center_col = int_square_root - center_col - 1
+        first_row, last_row = max(center_row - radius, 0), min(center_row + radius, table_height - 1)
+        first_col, last_col = max(center_col - radius, 0), min(center_col + radius, int_square_root - 1)
+
+    columns = last_col - first_col + 1
+    border = '*' * (GRID_WIDTH * columns + 1)
+    blank_line = ('*' + ' ' * (GRID_WIDTH - 1)) * columns + '*'
+    line_width = len(blank_line)
+    line = list(blank_line)
+
+    for table_row in range(first_row, last_row + 1):
+        yield border
+        row_start = table_row * int_square_root
+        # squares are filled in index order, so a long message spills the same way it does in fill_grid_square
+        if table_row % 2 == 0:
+            display_cols = range(first_col, last_col + 1)
+        else:
+            display_cols = range(last_col, first_col - 1, -1)
+        squares = []
+        for display_col in display_cols:
+            table_col = display_col if table_row % 2 == 0 else int_square_root - display_col - 1
+            index = row_start + table_col
+            if index < board_size:
+                squares.append((GRID_WIDTH * (display_col - first_col) + 1, (str(index), game_map[index])))
+
+        for line_number in range(GRID_HEIGHT - 1):
+            line[:] = blank_line  # reset the shared buffer in place
+            for column_start, message in squares:
+                if line_number < len(message):
+                    text = message[line_number][:line_width - column_start]
+                    line[column_start:column_start + len(text)] = text
+            yield ''.join(line)
+    yield border
+
+
+def display_board(game_map, center=None, radius=None):
+    """
+    displays the board
+    :param game_map: a list representing the game map.
+    :param center: optional index to only display a viewport around, see render_board
+    :param radius: how many squares to show on each side of center
+    """
+    for line in render_board(game_map, center, radius):
+        print(line)
+
+
+def benchmark_score_modes(length=1000, seed=1, steps=200000, chunk=20000):
+    """
+    Times math_command in every score mode over the same stream of map instructions, so the cost
+    of an ever growing exact score can be compared to the fixed width modes.
+
+    :param length: the length of the generated map
+    :param seed: the seed of the generated map
+    :param steps: how many math instructions to apply in each mode
+    :param chunk: how many steps are timed together, the throughput of each chunk is reported
+    :return: a dict mapping each score mode to its list of steps/sec, one entry per chunk
+    """
+    game_map = generate_random_map(length, seed)
+    commands = [command for command in game_map if command[:3] in ('add', 'sub', 'mul')]
+    if not commands:
+        return {}
+
+    results = {}
+    for score_mode in SCORE_MODES:
+        score = 0
+        throughput = []
+        for chunk_start in range(0, steps, chunk):
+            chunk_end = min(chunk_start + chunk, steps)
+            start_time = time.perf_counter()
+            for step in range(chunk_start, chunk_end):
+                score = math_command(score, commands[step % len(commands)], score_mode)
+            throughput.append((chunk_end - chunk_start) / max(time.perf_counter() - start_time, 1e-9))
+        results[score_mode] = throughput
+        print(f"{score_mode:>8}: first chunk {throughput[0]:,.0f} steps/sec, "
+              f"last chunk {throughput[-1]:,.0f} steps/sec, score has {score.bit_length()} bits")
+    return results
+
+
+def run_game(game_map, rng=None, score_mode='exact', max_steps=None):
+    """
+    The game engine, it plays a map without any printing or input and yields one event per turn.
+
+    :param game_map: a list representing the game map.
+    :param rng: where the dice rolls come from, anything with randint (defaults to the random module)
+    :param score_mode: the score arithmetic mode passed to math_command
+    :param max_steps: stop after this many turns even if hlt was not reached (None plays until hlt)
+    :return: a generator of dicts with 'step', 'position', 'roll', 'command' and 'score',
+        the last event has 'command' == 'hlt' unless max_steps ran out first.
+    """
+    if rng is None:
+        rng = random
+    board_size = len(game_map)
+    commands = [command.lower() for command in game_map]
     position = 0
     score = 0
-    game_over = False
+    step = 0
+    step_metric = instrumentation.get_metric('jumps_and_hits.step') if instrumentation.ENABLED else None
+
+    while max_steps is None or step < max_steps:
+        if step_metric:
+            blocks = sys.getallocatedblocks()
+            start_ns = time.perf_counter_ns()
+        step += 1
+        roll = rng.randint(1, DICE_SIDES)
+        position = (position + roll) % board_size
+        command = commands[position]
+
+        operation = command[:3]
+        if operation == 'add' or operation == 'sub' or operation == 'mul':
+            score = math_command(score, command, score_mode)
+        elif operation == 'jmp':
+            position = jump(position, command)
+            command = commands[position]  # Update command after jump
 
-    display_board(game_map)
+        if step_metric:
+            step_metric.record(time.perf_counter_ns() - start_ns, sys.getallocatedblocks() - blocks)
+        yield {'step': step, 'position': position, 'roll': roll, 'command': command, 'score': score}
+        if command == 'hlt':
+            return
 
-    while not game_over:
-        roll = roll_dice()
-        position = (position + roll) % len(game_map)
-        command = game_map[position].lower()
 
-        if command[:3] == 'add' or command[:3] == 'sub' or command[:3] == 'mul':
-            score = math_command(score, command)
-        elif command[:3] == 'jmp':
-            position = jump(position, command)
-            command = game_map[position].lower()  # Update command after jump
+def summarize_game(game_map, seed=0, score_mode='exact', max_steps=100000):
+    """
+    Plays a map to the end with its own seeded dice and keeps only the outcome.
 
-        print(f"Pos: {position} Score: {score}, instruction {command} Rolled: {roll}")
+    :param game_map: a list representing the game map.
+    :param seed: the seed of the dice rolls
+    :param score_mode: the score arithmetic mode passed to math_command
+    :param max_steps: the most turns to play before giving up on reaching hlt
+    :return: a dict with 'steps', 'final_position', 'final_score' and 'halted'
+    :raises ValueError: if the map has fewer than 2 squares
+    """
+    if len(game_map) < 2:
+        raise ValueError(f'A map needs at least 2 squares (nop and hlt), got {len(game_map)}')
+    event = {'step': 0, 'position': 0, 'command': game_map[0].lower(), 'score': 0}
+    for event in run_game(game_map, random.Random(seed), score_mode, max_steps):
+        pass
+    return {'steps': event['step'], 'final_position': event['position'], 'final_score': event['score'],
+            'halted': event['command'] == 'hlt'}
 
-        if command == 'hlt':
-            game_over = True
-        elif command != 'nop':
-            if command[:3] == 'jmp':
-                roll = 0
-            elif command[:3] == 'add' or command[:3] == 'sub' or command[:3] == 'mul':
-                roll = 0
 
-    print(f"Final Pos: {position} Final Score: {score}, Instruction {game_map[position]}")
-    if input("Play again? (yes/no): ").lower() == 'yes':
-        play()
+def _summarize_job(arguments):
+    return summarize_game(*arguments)
+
+
+def run_batch(jobs, score_mode='exact', max_steps=100000, processes=1):
+    """
+    Plays many games headlessly and returns their summaries in the same order as the jobs.
+
+    :param jobs: an iterable of (game_map, seed) pairs
+    :param score_mode: the score arithmetic mode passed to math_command
+    :param max_steps: the most turns to play in each game
+    :param processes: the number of worker processes, 1 plays everything in this process
+    :return: a list of summarize_game results
+    """
+    arguments = [(game_map, seed, score_mode, max_steps) for game_map, seed in jobs]
+    if processes == 1:
+        return [_summarize_job(job) for job in arguments]
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(_summarize_job, arguments, chunksize=max(len(arguments) // (4 * (processes or 4)), 1)))
+
+
+class SkipRollSolver:
+    """
+    Optimal policy for the variant of the game where the player sees each roll and may take it
+    or skip it (skipping uses up the turn without moving). The game lasts at most turns_left
+    turns, the score when it halts or runs out of turns is what counts.
+
+    Expected scores are found by dynamic programming over (position, score bucket) states,
+    one layer per turn. A forward pass collects the states reachable on each turn, sharing
+    states that several moves lead to (the shared states). A backward pass then works
+    from the last turn to the first, keeping only two layers of values. No more than
+    max_entries states are ever held; a solve that would need more raises ValueError
+    instead of running past the memory budget.
+    Scores are bucketed by keeping only their top precision_bits bits.
+    """
+
+    def __init__(self, game_map, turns_left=8, precision_bits=4, max_entries=1000000, score_mode='exact'):
+        """
+        :param game_map: a list representing the game map.
+        :param turns_left: how many turns the game lasts
+        :param precision_bits: how many leading bits of the score tell states apart
+        :param max_entries: the most states a solve may hold at once
+        :param score_mode: the score arithmetic mode passed to math_command
+        """
+        self.commands = [command.lower() for command in game_map]
+        self.turns_left = turns_left
+        self.precision_bits = precision_bits
+        self.max_entries = max_entries
+        self.score_mode = score_mode
+        self.shared_states = 0
+        self.new_states = 0
+        self.peak_entries = 0
+        self.solve_time = 0.0
+
+    def bucket(self, score):
+        """
+        :return: the score rounded down to its top precision_bits bits, the representative of its bucket
+        """
+        shift = abs(score).bit_length() - self.precision_bits
+        if shift <= 0:
+            return score
+        return (score >> shift) << shift
+
+    def take_roll(self, position, score, roll):
+        """
+        Moves like run_game does for one taken roll.
+
+        :return: (position, score, halted)
+        """
+        position = (position + roll) % len(self.commands)
+        command = self.commands[position]
+        operation = command[:3]
+        if operation == 'add' or operation == 'sub' or operation == 'mul':
+            score = math_command(score, command, self.score_mode)
+        elif operation == 'jmp':
+            position = jump(position, command)
+            command = self.commands[position]
+        return position, score, command == 'hlt'
+
+    def expected_score(self, position=0, score=0, turns_left=None):
+        """
+        :return: the expected final score of playing optimally from this state
+        :raises ValueError: if the solve needs more than max_entries states
+        """
+        if turns_left is None:
+            turns_left = self.turns_left
+        state = (position, self.bucket(score))
+        return self._solve({state}, turns_left)[state]
+
+    def should_take(self, position, score, roll, turns_left):
+        """
+        :return: True if taking this roll is at least as good as skipping it
+        :raises ValueError: if the solve needs more than max_entries states
+        """
+        if turns_left < 1:
+            raise ValueError('There are no turns left to take a roll in')
+        skip_state = (position, self.bucket(score))
+        new_position, new_score, halted = self.take_roll(position, skip_state[1], roll)
+        take_state = (new_position, self.bucket(new_score))
+        values = self._solve({skip_state} if halted else {skip_state, take_state}, turns_left - 1)
+        take_value = new_score if halted else values[take_state]
+        return take_value >= values[skip_state]
+
+    def _solve(self, starts, turns_left):
+        """
+        :param starts: the (position, score bucket) states to value
+        :param turns_left: how many turns are left from those states
+        :return: a dict mapping each start state to its expected final score
+        """
+        if turns_left < 0:
+            raise ValueError(f'turns_left must not be negative, got {turns_left}')
+        start_time = time.perf_counter()
+        try:
+            if turns_left == 0:
+                return {state: state[1] for state in starts}
+
+            # forward: layers[t] holds the states that can be reached after t turns
+            layers = [set(starts)]
+            held = len(layers[0])
+            for _ in range(turns_left - 1):
+                next_layer = set()
+                for position, score in layers[-1]:
+                    candidates = [(position, score)]
+                    for roll in range(1, DICE_SIDES + 1):
+                        new_position, new_score, halted = self.take_roll(position, score, roll)
+                        if not halted:
+                            candidates.append((new_position, self.bucket(new_score)))
+                    for candidate in candidates:
+                        if candidate in next_layer:
+                            self.shared_states += 1
+                        else:
+                            self.new_states += 1
+                            next_layer.add(candidate)
+                    # checked as the layer grows, so a hopeless solve gives up before building it
+                    if held + len(next_layer) > self.max_entries:
+                        raise ValueError(f'Solving {turns_left} turns needs more than max_entries='
+                                         f'{self.max_entries} states, use fewer turns, fewer precision_bits '
+                                         f'or a bigger budget')
+                held += len(next_layer)
+                layers.append(next_layer)
+            self.peak_entries = max(self.peak_entries, held)
+
+            # backward: values of the last turn's layer first, only the layer after is kept
+            next_values = None  # no turns left after the last layer, a state is worth its score
+            while layers:
+                values = {}
+                for state in layers.pop():
+                    position, score = state
+                    skip_value = score if next_values is None else next_values[state]
+                    total = 0
+                    for roll in range(1, DICE_SIDES + 1):
+                        new_position, new_score, halted = self.take_roll(position, score, roll)
+                        if halted:
+                            take_value = new_score
+                        else:
+                            new_score = self.bucket(new_score)
+                            take_value = new_score if next_values is None else next_values[(new_position, new_score)]
+                        total += max(take_value, skip_value)
+                    values[state] = total / DICE_SIDES
+                next_values = values
+            return next_values
+        finally:
+            self.solve_time += time.perf_counter() - start_time
+
+    def stats(self):
+        """
+        :return: a dict with the 'shared_states' (moves that led to a state already in its layer)
+            and 'new_states' of the forward passes, the 'shared_state_rate', the most states held
+            at once as 'entries' and the total 'solve_time' in seconds
+        """
+        moves = self.shared_states + self.new_states
+        return {'shared_states': self.shared_states, 'new_states': self.new_states,
+                'shared_state_rate': self.shared_states / moves if moves else 0.0,
+                'entries': self.peak_entries, 'solve_time': self.solve_time}
+
+
+def play_game(game_map, score_mode='exact'):
+    """
+    Main function to play the game with the given game map.
 
+    :param game_map: a list representing the game map.
+    :param score_mode: the score arithmetic mode passed to math_command
+    """
+    display_board(game_map)
 
+    position = 0
+    score = 0
+    for event in run_game(game_map, score_mode=score_mode):
+        position, score = event['position'], event['score']
+        print(f"Pos: {position} Score: {score}, instruction {event['command']} Rolled: {event['roll']}")
+
+    print(f"Final Pos: {position} Final Score: {score}, Instruction {game_map[position]}")
 
 
 def play():
@@ -159,7 +966,32 @@ def play():
         play_again = input("Play again? (yes/no): ").lower() == 'yes'
 
 
+def main(arguments=None):
+    """
+    Command line entry point. Without arguments it runs the interactive game, with --games it
+    plays that many seeded games headlessly and prints one summary line each.
+    """
+    parser = argparse.ArgumentParser(description='Jumps and hits')
+    parser.add_argument('--games', type=int, help='play this many games headlessly instead of interactively')
+    parser.add_argument('--length', type=int, default=100, help='the length of each generated map')
+    parser.add_argument('--seed', type=int, default=1, help='the seed of the first map, the rest follow on')
+    parser.add_argument('--score-mode', choices=SCORE_MODES, default='exact')
+    parser.add_argument('--max-steps', type=int, default=100000)
+    parser.add_argument('--processes', type=int, default=1)
+    options = parser.parse_args(arguments)
+
+    if options.games is None:
+        play()
+        return
+
+    seeds = range(options.seed, options.seed + options.games)
+    # generate_random_map treats seed 0 as unseeded, generate_map_arrays reproduces every seed
+    jobs = [(map_from_arrays(*generate_map_arrays(options.length, seed)), seed) for seed in seeds]
+    summaries = run_batch(jobs, options.score_mode, options.max_steps, options.processes)
+    for seed, summary in zip(seeds, summaries):
+        print(f"Seed: {seed} Steps: {summary['steps']} Final Pos: {summary['final_position']} "
+              f"Final Score: {summary['final_score']} Halted: {summary['halted']}")
+
 
 if __name__ == '__main__':
-    play()
- 
+    main()
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+import battleship
+
+
+def play_ai_game(seed, time_budget=0.003):
+    rng = random.Random(seed)
+    board = battleship.create_board()
+    battleship.place_ships_randomly(board, rng)
+    ai = battleship.BattleshipAI(time_budget)
+    shots = []
+    while not battleship.check_win_condition(board):
+        x, y = ai.choose_shot(rng)
+        shots.append((x, y))
+        ai.record_shot(x, y, *battleship.check_shot(board, x, y))
+    return shots
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_ai_never_fires_at_the_same_square_twice(seed):
+    shots = play_ai_game(seed)
+    assert len(shots) == len(set(shots))
+    assert len(shots) <= battleship.BOARD_SIZE ** 2
+
+
+def test_exact_search_fires_inside_the_only_consistent_placement():
+    ai = battleship.BattleshipAI(time_budget=1.0)
+    ships = {'C': [(0, y) for y in range(5)], 'B': [(2, y) for y in range(4)],
+             'S': [(4, y) for y in range(3)], 'D': [(6, 0), (6, 1)]}
+    for letter, squares in ships.items():
+        for x, y in squares:
+            ai.record_shot(x, y, True, letter)
+    # the cruiser can only be in the last row, so every other square is shot as a miss
+    cruiser = [(9, 7), (9, 8), (9, 9)]
+    for x in range(battleship.BOARD_SIZE):
+        for y in range(battleship.BOARD_SIZE):
+            if ai.shots[x][y] == " " and (x, y) not in cruiser:
+                ai.record_shot(x, y, False, None)
+    ai.record_shot(9, 8, True, 'C')
+    assert ai.choose_shot(random.Random(1)) in [(9, 7), (9, 9)]
+    assert ai.last_mode == "exact"
+
+
+def test_exact_search_counts_placement_building_against_the_budget():
+    ai = battleship.BattleshipAI(time_budget=0)
+    with pytest.raises(battleship._SearchTimeout):
+        ai._placements(deadline=0)
+    # a move that runs out of time falls back to the heuristics
+    for x in range(battleship.BOARD_SIZE):
+        for y in range(battleship.BOARD_SIZE - 1):
+            ai.record_shot(x, y, False, None)
+    assert ai.choose_shot(random.Random(1))[1] == battleship.BOARD_SIZE - 1
+    assert ai.last_mode != "exact"
+
+
+def test_win_condition_ignores_hits_and_misses():
+    board = battleship.create_board()
+    board[0][0], board[0][1] = "X", "-"
+    assert battleship.check_win_condition(board)
+    board[5][5] = "D"
+    assert not battleship.check_win_condition(board)
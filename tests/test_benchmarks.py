@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from benchmarks import __main__ as benchmarks
+
+
+def test_scaling_exponent_fits_the_end_points():
+    assert benchmarks.scaling_exponent([10, 100, 1000], [1.0, 5.0, 100.0]) == pytest.approx(1.0)
+    assert benchmarks.scaling_exponent([10, 100], [1.0, 100.0]) == pytest.approx(2.0)
+    assert benchmarks.scaling_exponent([10], [1.0]) is None
+    assert benchmarks.scaling_exponent([10, 100], [0.0, 1.0]) is None
+
+
+def test_compare_counts_sizes_slower_than_the_tolerance(capsys):
+    results = {'a': {'sizes': [1, 2, 3], 'seconds': [1.0, 2.6, 3.0]},
+               'b': {'sizes': [1], 'seconds': [5.0]}}
+    baseline = {'a': {'sizes': [1, 2], 'seconds': [1.0, 2.0]}}
+    assert benchmarks.compare(results, baseline, tolerance=1.25) == 1
+    output = capsys.readouterr().out
+    assert 'b: not in the baseline' in output
+    assert output.count('REGRESSION') == 1
+
+
+def test_time_call_only_times_run_after_setup():
+    calls = []
+
+    def setup():
+        calls.append('setup')
+        return len(calls)
+
+    def run(state):
+        calls.append(('run', state))
+    benchmarks.time_call((setup, run), 2)
+    assert calls == ['setup', ('run', 1), 'setup', ('run', 3)]
+
+
+def test_main_exits_non_zero_on_a_regression(tmp_path):
+    sizes = benchmarks.BENCHMARKS['battleship.win_check'][1]
+    fast = tmp_path / 'fast.json'
+    slow = tmp_path / 'slow.json'
+    fast.write_text(json.dumps({'battleship.win_check': {'sizes': sizes, 'seconds': [1e-12] * len(sizes)}}))
+    slow.write_text(json.dumps({'battleship.win_check': {'sizes': sizes, 'seconds': [60.0] * len(sizes)}}))
+    arguments = ['battleship.win_check', '--repeats', '1', '--compare']
+    assert benchmarks.main(arguments + [str(fast)]) == 1
+    assert benchmarks.main(arguments + [str(slow)]) == 0
@@ -0,0 +1,119 @@
+import json
+
+import carmen
+
+
+def make_game():
+    return {
+        'locations': {
+            'Rome': {'connections': ['paris', 'Lodnon']},
+            'Paris': {'connections': ['ROME'], 'starts-locked': True},
+        },
+        'people': {
+            'Bob': {'location': 'rome', 'conversation': 'Try Paris.', 'unlock-locations': ['Paris'],
+                    'unlock-people': ['alice']},
+            'X': {'conversation': 'Nothing to say.'},
+        },
+        'clues': {
+            'Note': {'location': 'Nowhere', 'clue-text': 'A note.'},
+        },
+        'starting-location': 'Rom',
+    }
+
+
+def test_validate_game_reports_every_bad_reference_in_one_pass():
+    game, errors = carmen.validate_game(make_game())
+    assert sorted(errors) == sorted([
+        'Location "Rome" "connections" refers to unknown location "Lodnon".',
+        'Person "Bob" "unlock-people" refers to unknown person "alice".',
+        'Person "X" has no "location".',
+        'Clue "Note" refers to unknown location "Nowhere".',
+        '"starting-location" refers to unknown location "Rom".',
+    ])
+
+
+def test_validate_game_normalises_names_to_their_spelling():
+    game = make_game()
+    del game['locations']['Rome']['connections'][1]
+    game['people']['Bob']['unlock-people'] = []
+    del game['people']['X']
+    del game['clues']['Note']
+    game['starting-location'] = 'rome'
+    game, errors = carmen.validate_game(game)
+    assert errors == []
+    assert game['locations']['Rome']['connections'] == ['Paris']
+    assert game['locations']['Paris']['connections'] == ['Rome']
+    assert game['locations']['Rome']['starts-locked'] is False
+    assert game['people']['Bob']['location'] == 'Rome'
+    assert game['starting-location'] == 'Rome'
+
+
+def test_validate_game_rejects_names_that_only_differ_in_capitalisation():
+    game = make_game()
+    game['locations']['PARIS'] = {'connections': []}
+    _, errors = carmen.validate_game(game)
+    assert 'Locations "Paris" and "PARIS" only differ in capitalisation.' in errors
+
+
+def test_find_name_ignores_capitalisation():
+    table = {'Rome': {}, 'Paris': {}}
+    assert carmen.find_name('Rome', table) == 'Rome'
+    assert carmen.find_name('pARIS', table) == 'Paris'
+    assert carmen.find_name('London', table) is None
+
+
+def test_load_game_prints_every_error_and_returns_none(tmp_path, capsys):
+    path = tmp_path / 'broken.game'
+    path.write_text(json.dumps(make_game()))
+    assert carmen.load_game(str(path)) is None
+    assert '{} has 5 errors:'.format(path) in capsys.readouterr().out
+
+
+def test_load_game_reuses_validated_games(tmp_path, monkeypatch):
+    path = tmp_path / 'rome.game'
+    game = make_game()
+    game['locations']['Rome']['connections'] = ['paris']
+    game['people'] = {}
+    game['clues'] = {}
+    game['starting-location'] = 'rome'
+    path.write_text(json.dumps(game))
+    first = carmen.load_game(str(path))
+    assert first['starting-location'] == 'Rome'
+
+    def fail(game):
+        raise AssertionError('validated twice')
+    monkeypatch.setattr(carmen, 'validate_game', fail)
+    second = carmen.load_game(str(path))
+    assert second == first and second is not first
+
+
+def baseline_can_go(start, end, locations, visited=None):
+    if visited is None:
+        visited = []
+    visited.append(start)
+    if start == end:
+        return True
+    if end in locations[start]['connections'] and not locations[end]['starts-locked']:
+        return True
+    for neighbor in locations[start]['connections']:
+        if neighbor not in visited and not locations[neighbor]['starts-locked']:
+            if baseline_can_go(neighbor, end, locations, visited):
+                return True
+    return False
+
+
+def test_can_go_matches_the_recursive_walk():
+    locations = {
+        'A': {'connections': ['B', 'C'], 'starts-locked': False},
+        'B': {'connections': ['A', 'D'], 'starts-locked': False},
+        'C': {'connections': ['E'], 'starts-locked': True},
+        'D': {'connections': ['B'], 'starts-locked': False},
+        'E': {'connections': ['A'], 'starts-locked': False},
+    }
+    for start in locations:
+        for end in locations:
+            for visited in (None, [start], [end], ['B'], ['B', 'D']):
+                expected = baseline_can_go(start, end, locations, list(visited) if visited else None)
+                assert carmen.can_go(start, end, locations, list(visited) if visited else None) == expected
+    assert carmen.can_go('A', 'A', locations, ['A'])
+    assert not carmen.can_go('A', 'E', locations)
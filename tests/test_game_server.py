@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+import game_server
+
+
+class SlowSession(game_server.Session):
+    async def handle(self, line, run_cpu):
+        if line == 'fail':
+            raise RuntimeError('worker crashed')
+        await asyncio.sleep(float(line))
+        return 'done'
+
+
+def run_with_server(client, **server_options):
+    """
+    Runs client(server, connect) against an in-process server, connect() opens a connection and
+    returns an ask(line) coroutine function that sends line and returns the reply lines.
+    """
+    async def main():
+        server = game_server.GameServer(processes=1, **server_options)
+        ready = asyncio.get_running_loop().create_future()
+        serving = asyncio.create_task(server.serve(port=0, ready=ready))
+        port = await ready
+        writers = []
+
+        async def connect():
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writers.append(writer)
+
+            async def ask(line):
+                if line is not None:
+                    writer.write(line if isinstance(line, bytes) else (line + '\n').encode())
+                    await writer.drain()
+                reply = []
+                while (reply_line := await reader.readline()) not in (b'', b'.\n'):
+                    reply.append(reply_line.decode().rstrip('\n'))
+                return reply
+            return ask
+
+        try:
+            await asyncio.wait_for(client(server, connect), 10)
+        finally:
+            for writer in writers:
+                writer.close()
+            serving.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await serving
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize('name', ['../x.game', '/etc/passwd', 'sub/x.game', 'x.txt', 'missing.game'])
+def test_open_session_only_opens_game_files_in_the_game_dir(tmp_path, name):
+    (tmp_path / 'x.txt').write_text('{}')
+    with pytest.raises(ValueError, match='No such game'):
+        game_server.open_session(f'carmen {name}', str(tmp_path))
+
+
+@pytest.mark.parametrize('line, reply', [
+    ('play 1 1', f'The board needs between 2 and {game_server.MAX_JUMPS_LENGTH} squares.'),
+    (f'play {game_server.MAX_JUMPS_LENGTH + 1} 1',
+     f'The board needs between 2 and {game_server.MAX_JUMPS_LENGTH} squares.'),
+    (f'solve 100 1 {game_server.MAX_SOLVE_TURNS + 1}', f'Solve at most {game_server.MAX_SOLVE_TURNS} turns.'),
+])
+def test_jumps_session_caps_request_sizes(line, reply):
+    async def run_cpu(func, *args):
+        raise AssertionError('capped requests must not reach the pool')
+    assert asyncio.run(game_server.JumpsSession().handle(line, run_cpu)) == reply
+
+
+def test_server_turns_sessions_away_once_full(monkeypatch):
+    monkeypatch.setattr(game_server, 'open_session', lambda line, game_dir: SlowSession())
+
+    async def client(server, connect):
+        first = await connect()
+        assert await first('slow') == ['']
+        second = await connect()
+        assert await second(None) == ['The server is full, try again later.']
+        assert server.sessions_rejected == 1
+    run_with_server(client, max_sessions=1)
+
+
+def test_failed_commands_and_bad_input_get_a_reply(monkeypatch):
+    monkeypatch.setattr(game_server, 'open_session', lambda line, game_dir: SlowSession())
+
+    async def client(server, connect):
+        ask = await connect()
+        await ask('slow')
+        assert await ask('fail') == ['Error: worker crashed']
+        assert await ask(b'\xff\xfe\n') == ["Error: could not convert string to float: '��'"]
+        assert await ask(b'x' * 70000 + b'\n') == ['Command not recognized.']
+        assert await ask('0') == ['done']
+    run_with_server(client)
+
+
+def test_eviction_skips_sessions_waiting_on_their_reply(monkeypatch):
+    monkeypatch.setattr(game_server, 'open_session', lambda line, game_dir: SlowSession())
+
+    async def client(server, connect):
+        ask = await connect()
+        await ask('slow')
+        # the command takes several idle timeouts, the session must still get its reply
+        assert await ask('0.6') == ['done']
+        assert server.sessions_evicted == 0
+        assert await ask(None) == ['Session closed for inactivity.']
+        assert server.sessions_evicted == 1
+        assert not server.last_active
+    run_with_server(client, idle_timeout=0.2)
+
+
+def test_jumps_workers_give_the_same_answer_for_seed_zero():
+    assert game_server.play_jumps(200, 0, 'exact') == game_server.play_jumps(200, 0, 'exact')
+    assert game_server.analyze_jumps(200, 0) == game_server.analyze_jumps(200, 0)
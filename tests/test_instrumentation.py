@@ -0,0 +1,18 @@
+import instrumentation
+
+
+def test_export_writes_histograms_and_a_net_allocation_gauge(tmp_path):
+    instrumentation.reset()
+    metric = instrumentation.get_metric('test.call')
+    metric.record(1500, allocated_blocks=4)
+    metric.record(500, allocated_blocks=-10)
+    path = tmp_path / 'metrics.prom'
+    instrumentation.export(path)
+    text = path.read_text()
+    instrumentation.reset()
+
+    assert 'games_call_duration_seconds_bucket{name="test.call",le="1e-06"} 1' in text
+    assert 'games_call_duration_seconds_bucket{name="test.call",le="2e-06"} 2' in text
+    assert 'games_call_duration_seconds_count{name="test.call"} 2' in text
+    assert '# TYPE games_allocated_blocks_net gauge' in text
+    assert 'games_allocated_blocks_net{name="test.call"} -6' in text
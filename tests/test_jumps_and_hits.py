@@ -0,0 +1,275 @@
+import math
+import random
+
+import pytest
+
+import jumps_and_hits
+
+
+@pytest.mark.parametrize('score, command, expected', [
+    (jumps_and_hits.INT64_MAX - 1, 'add 1', jumps_and_hits.INT64_MAX),
+    (jumps_and_hits.INT64_MAX - 1, 'add 5', jumps_and_hits.INT64_MAX),
+    (jumps_and_hits.INT64_MIN + 1, 'sub 1', jumps_and_hits.INT64_MIN),
+    (jumps_and_hits.INT64_MIN + 1, 'sub 5', jumps_and_hits.INT64_MIN),
+    (2 ** 62, 'mul 3', jumps_and_hits.INT64_MAX),
+])
+def test_saturate_clamps_to_the_int64_range(score, command, expected):
+    assert jumps_and_hits.math_command(score, command, 'saturate') == expected
+
+
+def test_modular_scores_keep_small_values_and_their_sign():
+    assert jumps_and_hits.math_command(0, 'sub 6', 'modular') == -6
+    assert jumps_and_hits.math_command(4, 'mul 5', 'modular') == 20
+    half = jumps_and_hits.SCORE_MODULUS // 2
+    assert jumps_and_hits.math_command(half, 'add 1', 'modular') == -half
+    score = 0
+    for _ in range(200):
+        score = jumps_and_hits.math_command(score, 'mul 97', 'modular')
+        score = jumps_and_hits.math_command(score, 'sub 1', 'modular')
+        assert -half <= score <= half
+
+
+def test_unknown_score_modes_are_rejected():
+    with pytest.raises(ValueError):
+        jumps_and_hits.math_command(1, 'add 1', 'wrapping')
+
+
+def test_log_score_tracker_follows_the_exact_score():
+    game_map = jumps_and_hits.generate_random_map(500, 2)
+    commands = [command for command in game_map if command[:3] in ('add', 'sub', 'mul')]
+    tracker = jumps_and_hits.LogScoreTracker()
+    score = 0
+    for step in range(5000):
+        command = commands[step % len(commands)]
+        score = jumps_and_hits.math_command(score, command)
+        tracker.apply(command)
+    assert score.bit_length() > 5000
+    assert tracker.sign == (1 if score > 0 else -1)
+    assert tracker.log10() == pytest.approx(math.log10(abs(score)), rel=1e-9)
+    assert tracker.value() == tracker.sign * float('inf')
+
+
+def test_corpus_is_identical_for_any_number_of_processes(tmp_path):
+    single = tmp_path / 'single.jhmc'
+    pooled = tmp_path / 'pooled.jhmc'
+    jumps_and_hits.write_map_corpus(single, 50, 30, seed=7, processes=1)
+    jumps_and_hits.write_map_corpus(pooled, 50, 30, seed=7, processes=2, chunk_size=7)
+    assert single.read_bytes() == pooled.read_bytes()
+
+
+def test_corpus_maps_match_their_seeds(tmp_path):
+    path = tmp_path / 'corpus.jhmc'
+    jumps_and_hits.write_map_corpus(path, 10, 25, seed=3, processes=1)
+    with jumps_and_hits.MapCorpus(path) as corpus:
+        assert len(corpus) == 10
+        for index in range(10):
+            expected = jumps_and_hits.generate_map_arrays(25, jumps_and_hits.map_seed(3, index))
+            assert corpus[index] == jumps_and_hits.map_from_arrays(*expected)
+            assert corpus[index][0] == 'nop' and corpus[index][-1] == 'hlt'
+
+
+def test_corpus_closes_while_views_are_alive(tmp_path):
+    path = tmp_path / 'corpus.jhmc'
+    jumps_and_hits.write_map_corpus(path, 2, 10, seed=1, processes=1)
+    with jumps_and_hits.MapCorpus(path) as corpus:
+        opcodes, operands = corpus.arrays(1)
+    # the views stay readable after closing, the mapping goes away with them
+    assert len(jumps_and_hits.map_from_arrays(opcodes, operands)) == 10
+    corpus.close()
+    with pytest.raises(ValueError):
+        corpus.arrays(0)
+
+
+@pytest.mark.parametrize('length', [0, 1])
+def test_maps_shorter_than_two_squares_are_rejected(tmp_path, length):
+    with pytest.raises(ValueError):
+        jumps_and_hits.generate_map_arrays(length)
+    with pytest.raises(ValueError):
+        jumps_and_hits.write_map_corpus(tmp_path / 'corpus.jhmc', 3, length, processes=1)
+
+
+def test_analyze_map_counts_jump_cycles_and_chains():
+    game_map = ['nop', 'jmp 2', 'jmp 3', 'jmp 1', 'jmp 5', 'jmp 6', 'hlt']
+    assert jumps_and_hits.resolve_jumps(game_map) == [0, -1, -1, -1, 6, 6, 6]
+    report = jumps_and_hits.analyze_map(game_map)
+    assert report['jump_cycles'] == 3
+    assert report['longest_jump_chain'] == 2
+    assert report['min_turns_to_halt'] == 1
+    assert not report['pathological']
+
+
+def test_analyze_map_finds_trap_regions_and_unreachable_halt():
+    # every roll from 0 or 1 ends on 1, and 1 never gets far enough to see hlt
+    game_map = ['nop', 'nop'] + ['jmp 1'] * 7 + ['hlt']
+    report = jumps_and_hits.analyze_map(game_map)
+    assert report['trap_regions'] == [[1]]
+    assert not report['halt_reachable']
+    assert report['min_turns_to_halt'] is None
+    assert report['pathological']
+
+
+@pytest.mark.parametrize('game_map, turns', [
+    (['nop'] * 7 + ['hlt'], 2),
+    (['nop', 'jmp 7'] + ['nop'] * 5 + ['hlt'], 1),
+    (['nop'] * 20 + ['hlt'], 4),
+])
+def test_analyze_map_min_turns_to_halt(game_map, turns):
+    report = jumps_and_hits.analyze_map(game_map, max_turns=turns)
+    assert report['min_turns_to_halt'] == turns
+    assert not report['pathological']
+    assert jumps_and_hits.analyze_map(game_map, max_turns=turns - 1)['pathological']
+
+
+def _reference_turns_to_halt(game_map):
+    seen = {0}
+    frontier = [0]
+    turns = 0
+    while frontier:
+        turns += 1
+        next_frontier = []
+        for position in frontier:
+            for roll in range(1, jumps_and_hits.DICE_SIDES + 1):
+                landing = (position + roll) % len(game_map)
+                if game_map[landing][:3] == 'jmp':
+                    landing = jumps_and_hits.jump(landing, game_map[landing])
+                if game_map[landing] == 'hlt':
+                    return turns
+                if landing not in seen:
+                    seen.add(landing)
+                    next_frontier.append(landing)
+        frontier = next_frontier
+    return None
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_analyze_map_matches_a_plain_search(seed):
+    game_map = jumps_and_hits.map_from_arrays(*jumps_and_hits.generate_map_arrays(3 + seed * 7, seed))
+    assert jumps_and_hits.analyze_map(game_map)['min_turns_to_halt'] == _reference_turns_to_halt(game_map)
+
+
+@pytest.mark.parametrize('length', [2, 5, 10, 17, 101])
+def test_render_board_matches_the_grid_helpers(length):
+    game_map = jumps_and_hits.generate_random_map(length, 4)
+    grid = jumps_and_hits.make_grid(length)
+    for index, command in enumerate(game_map):
+        jumps_and_hits.fill_grid_square(grid, length, index, f"{index}\n{command}")
+    assert list(jumps_and_hits.render_board(game_map)) == [''.join(row) for row in grid]
+
+
+class ScriptedDice:
+    def __init__(self, rolls):
+        self.rolls = iter(rolls)
+
+    def randint(self, low, high):
+        return next(self.rolls)
+
+
+def test_run_game_yields_one_event_per_turn():
+    game_map = ['nop', 'add 5', 'mul 3', 'jmp 6', 'sub 2', 'nop', 'nop', 'hlt']
+    events = list(jumps_and_hits.run_game(game_map, ScriptedDice([1, 1, 2, 6, 1, 1])))
+    assert [(event['step'], event['roll'], event['position'], event['command'], event['score'])
+            for event in events] == [
+        (1, 1, 1, 'add 5', 5),
+        (2, 1, 2, 'mul 3', 15),
+        (3, 2, 4, 'sub 2', 13),
+        (4, 6, 2, 'mul 3', 39),
+        (5, 1, 6, 'nop', 39),
+        (6, 1, 7, 'hlt', 39),
+    ]
+
+
+def test_run_game_is_reproducible_from_a_seeded_generator():
+    game_map = jumps_and_hits.generate_random_map(200, 9)
+    first = list(jumps_and_hits.run_game(game_map, random.Random(4), max_steps=500))
+    second = list(jumps_and_hits.run_game(game_map, random.Random(4), max_steps=500))
+    assert first == second
+    assert jumps_and_hits.summarize_game(game_map, 4, max_steps=500)['steps'] == len(first)
+
+
+def test_summarize_game_stops_at_max_steps():
+    # hlt can never be reached, see the trap region test above
+    game_map = ['nop', 'nop'] + ['jmp 1'] * 7 + ['hlt']
+    summary = jumps_and_hits.summarize_game(game_map, 1, max_steps=50)
+    assert summary['steps'] == 50
+    assert not summary['halted']
+    assert summary['final_position'] == 1
+
+
+@pytest.mark.parametrize('game_map', [[], ['hlt']])
+def test_summarize_game_rejects_maps_shorter_than_two_squares(game_map):
+    with pytest.raises(ValueError):
+        jumps_and_hits.summarize_game(game_map)
+
+
+def test_run_batch_gives_the_same_summaries_in_any_number_of_processes():
+    jobs = [(jumps_and_hits.generate_random_map(50, seed), seed) for seed in range(1, 9)]
+    assert jumps_and_hits.run_batch(jobs, processes=2) == jumps_and_hits.run_batch(jobs, processes=1)
+
+
+def test_headless_main_is_reproducible_for_every_seed(capsys):
+    arguments = ['--games', '3', '--seed', '0', '--length', '60']
+    jumps_and_hits.main(arguments)
+    first = capsys.readouterr().out
+    jumps_and_hits.main(arguments)
+    assert capsys.readouterr().out == first
+    assert first.startswith('Seed: 0 ')
+
+
+def _reference_value(game_map, position, score, turns_left):
+    """
+    Plain exhaustive recursion over every roll and choice, no buckets and no tables.
+    """
+    if turns_left == 0:
+        return score
+    skip_value = _reference_value(game_map, position, score, turns_left - 1)
+    total = 0
+    for roll in range(1, jumps_and_hits.DICE_SIDES + 1):
+        new_position = (position + roll) % len(game_map)
+        command = game_map[new_position]
+        new_score = score
+        if command[:3] in ('add', 'sub', 'mul'):
+            new_score = jumps_and_hits.math_command(score, command)
+        elif command[:3] == 'jmp':
+            new_position = jumps_and_hits.jump(new_position, command)
+            command = game_map[new_position]
+        if command == 'hlt':
+            take_value = new_score
+        else:
+            take_value = _reference_value(game_map, new_position, new_score, turns_left - 1)
+        total += max(take_value, skip_value)
+    return total / jumps_and_hits.DICE_SIDES
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+@pytest.mark.parametrize('turns_left', [0, 1, 2, 3])
+def test_solver_matches_exhaustive_search(seed, turns_left):
+    game_map = jumps_and_hits.generate_random_map(20, seed)
+    # enough precision bits that no two scores share a bucket
+    solver = jumps_and_hits.SkipRollSolver(game_map, turns_left, precision_bits=64)
+    assert solver.expected_score() == pytest.approx(_reference_value(game_map, 0, 0, turns_left))
+
+
+def test_solver_rejects_solves_over_its_budget():
+    solver = jumps_and_hits.SkipRollSolver(jumps_and_hits.generate_random_map(1000, 5), 10, max_entries=100)
+    with pytest.raises(ValueError):
+        solver.expected_score()
+    stats = solver.stats()
+    assert stats['entries'] <= 100
+    # the budget is checked while a layer grows, so the pass stops soon after crossing it
+    assert stats['new_states'] <= 101
+
+
+def test_solver_counts_states_shared_between_moves():
+    # every roll and the skip from a two square map lead back to the same two states
+    solver = jumps_and_hits.SkipRollSolver(['nop', 'nop'], turns_left=3)
+    solver.expected_score()
+    stats = solver.stats()
+    assert stats['new_states'] == 4
+    assert stats['shared_state_rate'] == stats['shared_states'] / (stats['shared_states'] + stats['new_states'])
+
+
+def test_solver_handles_long_horizons_without_recursion():
+    game_map = ['nop', 'add 1', 'nop', 'add 2', 'nop', 'nop', 'nop', 'hlt']
+    solver = jumps_and_hits.SkipRollSolver(game_map, turns_left=300)
+    assert solver.expected_score() > 0
+    assert solver.should_take(0, 0, 1, 300)